@@ -0,0 +1,92 @@
+'''
+code file: bench/bench_highlight.py
+date: Oct 2026
+comments:
+    Keystroke latency of the SQL editor highlighting
+        $ python3 bench/bench_highlight.py [lines] [keystrokes]
+    Fills a Text widget with a generated SQL script (10,000 lines
+    by default), types characters at random lines and reports the
+    time from the insert until the highlighting is up to date.
+    The old full-rescan highlighter (Tk regex search over the whole
+    buffer) is timed once on the same text for comparison.
+    Needs a display (use xvfb-run on a headless box).
+'''
+import os
+import sys
+import time
+import random
+import statistics
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+from sqlhilite import Highlighter
+
+SAMPLE = [
+    "# totals per state for {n}",
+    "select d1.Policy, last_name, first_name, 'policy {n}' as note,",
+    "\tcount(*) as n, sum(InsuredValue) total, round(avg(InsuredValue), 2)",
+    "\tfrom d1 join d2 on d1.Policy = d2.Policy",
+    "\twhere State in ('FL', 'GA') and Expiry > date('now')",
+    "\tgroup by State order by total desc;",
+]
+
+
+def script(lines):
+    return "\n".join(SAMPLE[i % len(SAMPLE)].format(n=i) for i in range(lines))
+
+
+def full_rescan(text):
+    ''' the highlighter this replaced: two Tk regex searches over everything '''
+    count = tk.IntVar()
+    for pattern, tag in ((r"(#.*|//.*)\n", "remarks"),
+                         (r"[\"\'`]((?:.|\n)*?)[\'\"`]", "literals")):
+        text.tag_remove(tag, "1.0", "end")
+        text.mark_set("matchEnd", "1.0")
+        while True:
+            index = text.search(pattern, "matchEnd", "end", count=count, regexp=True)
+            if index == "" or count.get() == 0:
+                break
+            text.mark_set("matchEnd", "%s+%sc" % (index, count.get()))
+            text.tag_add(tag, index, "matchEnd")
+
+
+def main(lines=10000, keystrokes=500):
+    root = tk.Tk()
+    text = tk.Text(root)
+    text.pack()
+    text.insert("1.0", script(lines))
+    root.update()
+
+    start = time.perf_counter()
+    highlighter = Highlighter(text)
+    root.update()
+    first_pass = time.perf_counter() - start
+
+    random.seed(1)
+    latencies = []
+    for i in range(keystrokes):
+        line = random.randint(1, lines)
+        text.mark_set("insert", f"{line}.0 lineend")
+        start = time.perf_counter()
+        highlighter.before_edit()  # what the <KeyPress> binding does
+        text.insert("insert", "'" if i % 50 == 0 else "x")
+        root.update()  # delivers <<Modified>>, the highlighter runs
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    full_rescan(text)
+    rescan = time.perf_counter() - start
+    root.destroy()
+
+    latencies.sort()
+    ms = lambda s: f"{s * 1000:8.2f} ms"
+    print(f"lines: {lines:,}  keystrokes: {keystrokes}")
+    print(f"first pass (whole text)  {ms(first_pass)}")
+    print(f"keystroke median         {ms(statistics.median(latencies))}")
+    print(f"keystroke p95            {ms(latencies[int(len(latencies) * 0.95)])}")
+    print(f"keystroke max            {ms(latencies[-1])}")
+    print(f"old full rescan, once    {ms(rescan)}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,385 @@
+'''
+code file: bench/bench_pipeline.py
+date: Oct 2026
+comments:
+    Load, query and export throughput of the batch pipeline
+        $ python3 bench/bench_pipeline.py [--sizes 1k,100k,1M] [--formats csv,xlsx]
+        $ python3 bench/bench_pipeline.py --output new.json --compare baseline.json
+    Generates synthetic inputs (policies and claims: ids, names,
+    low cardinality text, ISO dates, money, flags and mostly empty
+    notes) with a fixed seed, once per size and format, in --data.
+    .xls inputs need xlwt and hold at most 65,535 rows, .xlsx inputs
+    at most 1,048,575; larger sizes are skipped for those formats.
+    Every case runs load_tables -> create_indexes -> export_outputs
+    as sqlbatch.py does, without the GUI: the testfiles setups and,
+    per size and format, a group by (scan), a join of policies and
+    claims (join) and a large filtered output (export).
+    A case runs in a process of its own, --repeat times with an empty
+    input cache (cold) and as often from the cache (warm); the median
+    is kept. The JSON result has the seconds per stage, the rows
+    written and the peak memory of every case.
+    --compare flags cases that got slower than in an earlier result
+    (made on the same machine) by more than --tolerance; the exit
+    code is then 1.
+'''
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import platform
+import argparse
+import statistics
+import tempfile
+import multiprocessing
+import sqlite3
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+from sqlengine import FrameCache, Session, RunTrace, run_pipeline
+from sqlengine import read_setup, strip_remarks, parse_item, split_outputs
+from sqlengine import HAVE_ARROW, XLSX_MAX_ROWS
+from sqlbatch import is_setup, use_stream
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+TESTFILES = os.path.join(HERE, "..", "testfiles")
+DATA_DIR = os.path.join(tempfile.gettempdir(), "sqlcells_bench")
+SEED = 1
+XLS_MAX_ROWS = 65535   # .xls sheets hold 65,536 rows, one is the header
+TOLERANCE = 0.15       # --compare: slower by more than this share is a regression
+MIN_DELTA = 0.05       # --compare: and by more than this many seconds (timer noise)
+STATES = ["AL", "AZ", "CA", "CO", "FL", "GA", "IL", "MA", "MI", "NC",
+          "NJ", "NY", "OH", "PA", "TX", "VA", "WA", "WI"]
+STATUS = ["open", "paid", "paid", "paid", "denied"]
+FIRST = ["Ann", "Bob", "Carla", "Dmitri", "Eva", "Farid", "Grace", "Hiro",
+         "Ines", "Jamal", "Kim", "Luis", "Mara", "Nils", "Olga", "Pedro"]
+LAST = ["Adams", "Baker", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes",
+        "Ito", "Jones", "Khan", "Lopez", "Miller", "Novak", "Okafor", "Patel",
+        "Quinn", "Rossi", "Smith", "Tanaka", "Usman", "Vargas", "Weber", "Young"]
+
+CASES = {
+    # name: (sql, output extension or None for the input format's)
+    "scan": ("""select State, count(*) n, round(avg(InsuredValue), 2) avg_value,
+        max(Expiry) last_expiry from d1 group by State order by State""", ".csv"),
+    "join": ("""select d1.State, d2.Status, count(*) claims, round(sum(Amount), 2) total
+        from d1 join d2 on d1.Policy = d2.Policy
+        where Active = 1 group by d1.State, d2.Status order by total desc""", ".csv"),
+    "export": ("select * from d1 where InsuredValue > 250000", None),
+}
+
+
+def parse_size(text):
+    ''' "1k" -> 1000, "10M" -> 10000000 '''
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def policies(rows):
+    ''' the policies table: one row per policy '''
+    rng = np.random.default_rng(SEED)
+    first = rng.choice(FIRST, rows)
+    last = rng.choice(LAST, rows)
+    ids = np.arange(1, rows + 1)
+    note = np.where(rng.random(rows) < 0.05, "renewal pending", None)
+    expiry = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 3650, rows), unit="D")
+    return pd.DataFrame({
+        "Policy": ids,
+        "first_name": first,
+        "last_name": last,
+        "email": [f"{f}.{l}{i}@example.com".lower() for f, l, i in zip(first, last, ids)],
+        "State": rng.choice(STATES, rows),
+        "Expiry": expiry.strftime("%Y-%m-%d"),
+        "InsuredValue": np.round(rng.lognormal(11.5, 0.8, rows), 2),
+        "Active": rng.integers(0, 2, rows),
+        "Note": note,
+    })
+
+
+def claims(rows):
+    ''' the claims table: as many rows as policies, random policies '''
+    rng = np.random.default_rng(SEED + 1)
+    filed = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 3650, rows), unit="D")
+    return pd.DataFrame({
+        "Claim": np.arange(1, rows + 1),
+        "Policy": rng.integers(1, rows + 1, rows),
+        "Filed": filed.strftime("%Y-%m-%d"),
+        "Amount": np.round(rng.gamma(2.0, 1500.0, rows), 2),
+        "Status": rng.choice(STATUS, rows),
+    })
+
+
+def max_rows(fmt):
+    ''' most rows an input of format fmt can hold, 0 when it cannot be written '''
+    if fmt == "xls":
+        try:
+            import xlwt  # noqa: F401, only needed to write .xls inputs
+        except ImportError:
+            return 0
+        return XLS_MAX_ROWS
+    if fmt == "xlsx":
+        return XLSX_MAX_ROWS - 1
+    return sys.maxsize
+
+
+def write_input(df, path):
+    ''' write df to path (.csv, .xlsx or .xls) through a temp file, so an
+    interrupted run never leaves a half written input behind '''
+    tmp = path + ".tmp"
+    if path.endswith(".csv"):
+        df.to_csv(tmp, index=False)
+    elif path.endswith(".xlsx"):
+        _write_xlsx(df, tmp)
+    else:
+        import xlwt
+        wb = xlwt.Workbook()
+        ws = wb.add_sheet("Sheet1")
+        for c, name in enumerate(df.columns):
+            ws.write(0, c, name)
+        for r, row in enumerate(df.itertuples(index=False), 1):
+            for c, v in enumerate(row):
+                if v is not None:
+                    ws.write(r, c, v.item() if hasattr(v, "item") else v)
+        wb.save(tmp)
+    os.replace(tmp, path)
+
+
+def _write_xlsx(df, path):
+    # write-only workbook, dates as real spreadsheet dates
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(list(df.columns))
+    dates = [c for c in ("Expiry", "Filed") if c in df.columns]
+    df = df.astype(object).assign(**{c: pd.to_datetime(df[c]).dt.to_pydatetime() for c in dates})
+    for row in df.itertuples(index=False):
+        ws.append(row)
+    wb.save(path)
+
+
+def make_inputs(data, rows, fmt):
+    ''' (policies path, claims path) with rows rows each, generated when missing '''
+    paths = []
+    for table, make in (("policies", policies), ("claims", claims)):
+        path = os.path.join(data, f"{table}_{rows}.{fmt}")
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            write_input(make(rows), path)
+            print(f"generated {path} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        paths.append(path)
+    return paths
+
+
+def testfile_setups():
+    ''' (name, setup) of the setup files in testfiles/, input paths made absolute '''
+    found = []
+    for fname in sorted(glob.glob(os.path.join(TESTFILES, "*"))):
+        if not is_setup(fname):
+            continue
+        setup = read_setup(fname)
+        inputs = []
+        for item in setup["inputs"]:
+            name, path, ftype, sheet = parse_item(item)
+            path = os.path.normpath(os.path.join(HERE, "..", path))
+            inputs.append(f"{name}: {path}" + (f"[{sheet}]" if sheet else ""))
+        setup["inputs"] = inputs
+        found.append((f"setup/{os.path.basename(fname)}", setup))
+    return found
+
+
+def plan_cases(data, sizes, formats):
+    ''' [(case name, setup)] of every case to run, and the skipped ones '''
+    cases = testfile_setups()
+    skipped = []
+    for fmt in formats:
+        for rows in sizes:
+            if rows > max_rows(fmt):
+                skipped.append(f"{fmt}/{rows}: " + ("xlwt not installed" if max_rows(fmt) == 0
+                                                   else f"more than {max_rows(fmt):,} rows"))
+                continue
+            d1, d2 = make_inputs(data, rows, fmt)
+            for kind, (sql, ext) in CASES.items():
+                inputs = [f"d1: {d1}"] + ([f"d2: {d2}"] if "d2" in sql else [])
+                setup = {"inputs": inputs, "sql": sql, "output": kind + (ext or "." + fmt),
+                         "options": set(), "params": {}}
+                cases.append((f"{kind}/{fmt}/{rows}", setup))
+    return cases, skipped
+
+
+def run_once(setup, cache, outdir, workdb, load_workers):
+    ''' one pass through the pipeline,
+    returns (seconds, {stage: seconds}, rows written, peak memory MB) '''
+    query = strip_remarks(setup["sql"])
+    output = "; ".join(os.path.join(outdir, os.path.basename(out))
+                       for out in split_outputs(setup["output"]))
+    inputs = [parse_item(f) for f in setup["inputs"]]
+    stream = use_stream(setup, inputs)
+    if stream and os.path.exists(workdb):
+        os.remove(workdb)  # a fresh working database, else nothing is ingested
+    trace = RunTrace()
+    start = time.perf_counter()
+    session = Session(workdb if stream else ":memory:")
+    try:
+        run = run_pipeline(session, setup["inputs"], query, output, cache,
+                           params=setup["params"], refresh=True, stream=stream,
+                           compact="COMPACT" in setup["options"], load_workers=load_workers,
+                           trace=trace)
+    finally:
+        session.close()
+    seconds = time.perf_counter() - start
+    stages = {}
+    for s in trace.stages:
+        stages[s["stage"]] = stages.get(s["stage"], 0.0) + s["seconds"]
+    return seconds, stages, run["rows"], trace.peak_mb()
+
+
+def run_case(name, setup, data, repeat, load_workers):
+    ''' repeat cold and warm runs of one case (in a process of its own) '''
+    tag = name.replace("/", "_")
+    cache_dir = os.path.join(data, "cache", tag)
+    outdir = os.path.join(data, "out", tag)
+    workdb = os.path.join(data, f"work_{tag}.db")
+    os.makedirs(outdir, exist_ok=True)
+    result = {"case": name, "ok": False, "error": None}
+    try:
+        cold, warm = [], []
+        for i in range(max(1, repeat)):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            cache = FrameCache(cache_dir, max_mb=1 << 20)  # nothing is evicted during a case
+            cold.append(run_once(setup, cache, outdir, workdb, load_workers))
+            warm.append(run_once(setup, cache, outdir, workdb, load_workers))
+        result["cold"], result["warm"] = _median(cold), _median(warm)
+        result.update(ok=True, rows_out=cold[0][2])
+        rows_in = sum(_input_rows(setup))
+        if rows_in:
+            seconds = result["cold"]["seconds"]
+            result["rows_in"] = rows_in
+            result["rows_per_s"] = round(rows_in / seconds) if seconds > 0 else None
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        if os.path.exists(workdb):
+            os.remove(workdb)
+    if result["ok"]:
+        result["peak_rss_mb"] = max((r[3] or 0 for r in cold + warm), default=None)
+    return result
+
+
+def _median(runs):
+    # median seconds of the runs and of each of their stages
+    stages = [stage for stage in ("parse", "store", "ingest", "index", "statement", "query", "export")
+              if any(stage in r[1] for r in runs)]
+    return {"seconds": round(statistics.median(r[0] for r in runs), 4),
+            "stages": {k: round(statistics.median(r[1].get(k, 0.0) for r in runs), 4) for k in stages}}
+
+
+def _input_rows(setup):
+    # row counts of the generated inputs are in their file names
+    for item in setup["inputs"]:
+        name, path, ftype, sheet = parse_item(item)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if stem.startswith(("policies_", "claims_")):
+            yield int(stem.split("_")[-1])
+
+
+def environment():
+    return {"time": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "pandas": pd.__version__,
+            "sqlite": sqlite3.sqlite_version, "pyarrow": HAVE_ARROW,
+            "machine": platform.machine(), "system": platform.system(),
+            "cpus": os.cpu_count()}
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    ''' [(case, run, old seconds, new seconds, ratio, regression)] for the
+    cases and runs (cold, warm) present in both results '''
+    old = {r["case"]: r for r in baseline["cases"] if r.get("ok")}
+    rows = []
+    for r in results["cases"]:
+        if not r.get("ok") or r["case"] not in old:
+            continue
+        for run in ("cold", "warm"):
+            if run not in r or run not in old[r["case"]]:
+                continue
+            a, b = old[r["case"]][run]["seconds"], r[run]["seconds"]
+            ratio = b / a if a > 0 else 1.0
+            slower = ratio > 1 + tolerance and b - a > MIN_DELTA
+            rows.append((r["case"], run, a, b, ratio, slower))
+    return rows
+
+
+def compare_report(rows):
+    lines = [f"{'case':<32} {'run':<5} {'before':>9} {'after':>9} {'ratio':>7}"]
+    for case, run, a, b, ratio, slower in rows:
+        flag = "  REGRESSION" if slower else ""
+        lines.append(f"{case:<32} {run:<5} {a:>8.3f}s {b:>8.3f}s {ratio:>6.2f}x{flag}")
+    regressions = sum(1 for row in rows if row[-1])
+    lines.append(f"{regressions} regression(s) in {len(rows)} comparison(s)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench_pipeline.py",
+                                     description="Load, query and export throughput of SQLcells.")
+    parser.add_argument("--sizes", default="1k,10k,100k",
+                        help="input rows, comma separated, k and M suffixes (default: 1k,10k,100k)")
+    parser.add_argument("--formats", default="csv,xlsx,xls",
+                        help="input formats, comma separated (default: csv,xlsx,xls)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="cold and warm runs per case, the median is kept (default: 3)")
+    parser.add_argument("--load-workers", type=int, default=1,
+                        help="processes parsing the inputs of a case (default: 1)")
+    parser.add_argument("--data", default=DATA_DIR,
+                        help=f"generated inputs and outputs (default: {DATA_DIR})")
+    parser.add_argument("--only", help="run only the cases whose name contains this text")
+    parser.add_argument("--output", help="write the JSON result to this file instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="flag cases slower than in this earlier JSON result")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"share a case may get slower before it is flagged (default: {TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(parse_size(s) for s in args.sizes.split(",") if s.strip())
+    formats = [f.strip().lstrip(".") for f in args.formats.split(",") if f.strip()]
+    os.makedirs(args.data, exist_ok=True)
+    cases, skipped = plan_cases(args.data, sizes, formats)
+    if args.only:
+        cases = [(name, setup) for name, setup in cases if args.only in name]
+
+    results = {"environment": environment(), "sizes": sizes, "formats": formats,
+               "repeat": args.repeat, "skipped": skipped, "cases": []}
+    for name, setup in cases:
+        # a fresh (spawned, not forked) process per case: its peak memory is its own
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(run_case, name, setup, args.data,
+                                 args.repeat, args.load_workers).result()
+        results["cases"].append(result)
+        if result["ok"]:
+            print(f"{name:<32} cold {result['cold']['seconds']:8.3f}s"
+                  f"  warm {result['warm']['seconds']:8.3f}s", file=sys.stderr)
+        else:
+            print(f"{name:<32} {result['error']}", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fout:
+            fout.write(text + "\n")
+    else:
+        print(text)
+
+    failed = any(not r["ok"] for r in results["cases"])
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fin:
+            rows = compare(results, json.load(fin), args.tolerance)
+        print(compare_report(rows), file=sys.stderr)
+        failed = failed or any(row[-1] for row in rows)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+'''
+code file: sqlbatch.py
+date: Oct 2026
+comments:
+    Run saved query setup files without the GUI
+        $ python3 sqlbatch.py setup1.txt setup2.txt
+        $ python3 sqlbatch.py -j 8 --summary runs.json setups/
+        $ python3 sqlbatch.py --watch report.txt
+    A directory argument runs every sqlcells setup file in it.
+    Setups run on a pool of worker processes; inputs used by
+    several setups are parsed once into the shared input cache.
+    LAUNCH is ignored, LOG appends to sqllog.txt as in the GUI.
+    A setup with PARAMS writes one output per parameter value,
+    --param-workers of them at the same time.
+    Exit code: 0 all setups ran, 1 a setup failed, 2 usage error
+    A JSON summary is written to stdout (or --summary FILE).
+    --watch keeps running: a setup is run again when one of its
+    inputs changed and then stayed unchanged for --debounce seconds,
+    only the changed tables are reloaded. A JSON line with the
+    refresh latency is written (or appended to FILE) per run.
+    Setups with LOG also append a per stage trace to sqlrun.jsonl,
+    --report summarizes where the time went across those runs.
+        $ python3 sqlbatch.py --report [sqlrun.jsonl]
+'''
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from sqlengine import FrameCache, Session, ResultCache, parse_item, referenced_tables
+from sqlengine import read_setup, strip_remarks, append_log, run_pipeline, run_notes
+from sqlengine import file_type, driving_queries, content_hash, has_cached_outputs
+from sqlengine import split_outputs, RunTrace
+from sqlengine import WORK_DB, STREAM_CSV_MB, OUTPUT_TYPES, RUN_LOG
+
+
+def find_setups(paths):
+    ''' setup files named in paths, directories are searched
+    (not recursively) for files that start with "sqlcells" '''
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                fname = os.path.join(path, name)
+                if os.path.isfile(fname) and is_setup(fname):
+                    found.append(os.path.abspath(fname))
+        else:
+            found.append(os.path.abspath(path))
+    return found
+
+
+def is_setup(fname):
+    try:
+        with open(fname, "r", encoding="utf-8") as fin:
+            return fin.readline().strip() == "sqlcells"
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def use_stream(setup, inputs):
+    ''' True when csv inputs are streamed into the working database '''
+    if "STREAM" in setup["options"]:
+        return True
+    for name, path, ftype, sheet in inputs:
+        if ftype == "csv" and os.path.getsize(path) > STREAM_CSV_MB * 1024 * 1024:
+            return True
+    return False
+
+
+def run_setup(fname, load_workers=1, force=False, param_workers=1, sessions=None):
+    ''' run one setup file, returns a summary dict (never raises)
+    load_workers processes parse the inputs of the setup
+    force=True runs the query even when a cached result exists
+    param_workers outputs of a PARAMS setup are written at the same time
+    sessions {setup file: Session} keeps the loaded tables between
+    runs (watch mode), unchanged inputs are then not loaded again '''
+    start = time.perf_counter()
+    result = {"setup": fname, "output": None, "ok": False, "cached": False,
+              "rows": 0, "seconds": 0.0, "load": {}, "error": None}
+    try:
+        setup = read_setup(fname)
+        outfile = setup["output"]
+        result["output"] = outfile
+        if not setup["inputs"]:
+            raise ValueError("Input files missing")
+        if not all(out.endswith(OUTPUT_TYPES) for out in split_outputs(outfile)):
+            raise ValueError("The specified file format is not supported.")
+        query = strip_remarks(setup["sql"])
+        params = setup["params"]
+        refresh = force or "REFRESH" in setup["options"]
+        results = ResultCache()
+        trace = RunTrace(setup=fname, sql=query[:500]) if "LOG" in setup["options"] else None
+        inputs = [parse_item(f) for f in setup["inputs"]]
+        stream = use_stream(setup, inputs)
+        cache = FrameCache()
+        # streamed setups (and PARAMS setups exported in parallel, which need
+        # an on-disk database) keep their own working database between runs
+        if stream or (params and param_workers > 1):
+            tag = hashlib.sha1(fname.encode("utf-8")).hexdigest()[:10]
+            dbpath = f"{os.path.splitext(WORK_DB)[0]}.{tag}.db"
+        else:
+            dbpath = ":memory:"
+        if sessions is None:
+            session = Session(dbpath)
+        else:
+            session = sessions.get(fname)
+            if session is None or session.dbpath != dbpath:
+                if session is not None:
+                    session.close()
+                session = sessions[fname] = Session(dbpath)
+        try:
+            run = run_pipeline(session, setup["inputs"], query, outfile, cache, results, params,
+                               refresh, stream, "COMPACT" in setup["options"],
+                               load_workers, param_workers, trace=trace,
+                               kept=sessions is not None)
+        finally:
+            if sessions is None:
+                session.close()
+        outputs = run["outputs"]
+        result["load"] = {name: round(t, 3) for name, t in run["timings"].items()}
+        if len(outputs) != 1 or params:
+            result["outputs"] = [{"output": out, "rows": n, "cached": hit}
+                                 for out, n, s, hit in outputs]
+        if "LOG" in setup["options"]:
+            append_log(setup["inputs"], query, outfile, run_notes(run, cache))
+            trace.write(cached=run["cached"], rows=run["rows"],
+                        outputs=[out for out, n, s, hit in outputs])
+        result.update(ok=True, cached=run["cached"], rows=run["rows"])
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def parse_shared(path, sheets):
+    ''' fill the input cache with path (the sheets of a workbook),
+    returns an error or None '''
+    try:
+        if file_type(path) == "xls":
+            FrameCache().load_sheets(path, sheets)
+        else:
+            FrameCache().load(path)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def shared_inputs(setups, force=False):
+    ''' excel/csv inputs parsed by more than one setup file
+    (sqlite inputs are attached and streamed csv inputs are ingested
+    in chunks, neither is parsed; tables the sql does not read and
+    setups served from the result cache - unless force or REFRESH -
+    do not count)
+    returns [(path, [sheets used])] '''
+    count = {}
+    sheets = {}
+    results = ResultCache()
+    for fname in setups:
+        try:
+            setup = read_setup(fname)
+            items = [parse_item(f) for f in setup["inputs"] if ": " in f]
+            stream = use_stream(setup, items)
+            query = strip_remarks(setup["sql"])
+            if not (force or setup["params"] or "REFRESH" in setup["options"]) and \
+                    has_cached_outputs(results, query, setup["inputs"], setup["output"]):
+                continue
+            used = referenced_tables("\n".join([query] + driving_queries(setup["params"])),
+                                     [name for name, path, ftype, sheet in items])
+        except Exception:
+            continue  # reported when the setup runs
+        items = [(path, sheet) for name, path, ftype, sheet in items if name in used and
+                 (ftype == "xls" or (ftype == "csv" and not stream))]
+        for path in set(path for path, sheet in items):
+            count[path] = count.get(path, 0) + 1
+        for path, sheet in items:
+            sheets.setdefault(path, {})[sheet] = True
+    return [(path, list(sheets[path])) for path, n in count.items()
+            if n > 1 and os.path.isfile(path)]
+
+
+def run_batch(setups, workers=None, load_workers=1, force=False, param_workers=1):
+    ''' run the setup files on a process pool, returns the summary dict '''
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # parse shared inputs once, the setups then read them from the cache
+        shared = shared_inputs(setups, force)
+        list(pool.map(parse_shared, [p for p, s in shared], [s for p, s in shared]))
+        n = len(setups)
+        results = list(pool.map(run_setup, setups, [load_workers] * n, [force] * n,
+                                [param_workers] * n))
+    failed = sum(1 for r in results if not r["ok"])
+    return {"jobs": results,
+            "ok": len(results) - failed,
+            "failed": failed,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def input_stamps(fname):
+    ''' {path: (mtime, size) or None when missing} of the setup file and its inputs '''
+    stamps = {fname: _stamp(fname)}
+    try:
+        setup = read_setup(fname)
+    except Exception:
+        return stamps  # being saved, or reported when the setup runs
+    for item in setup["inputs"]:
+        if ": " in item:
+            path = parse_item(item)[1]
+            stamps[path] = _stamp(path)
+    return stamps
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def watch(setups, interval=1.0, debounce=2.0, load_workers=1, force=False, param_workers=1,
+          report=None):
+    ''' run the setups, then run a setup again whenever its inputs changed
+    and stayed unchanged for debounce seconds (files being written are not
+    read), polling every interval seconds - a changed modification time
+    with the same contents does not count
+    report(cycle) is called with a dict per run, until KeyboardInterrupt '''
+    sessions = {}  # the tables of every setup stay loaded
+    state = {fname: {"ran": None, "seen": None, "since": 0.0, "hashes": {}} for fname in setups}
+    cycle = 0
+    try:
+        while True:
+            for fname in setups:
+                st = state[fname]
+                stamps = input_stamps(fname)
+                now = time.time()
+                if stamps != st["seen"]:
+                    st["seen"], st["since"] = stamps, now
+                if stamps == st["ran"]:
+                    continue  # nothing new since the last run
+                if st["ran"] is not None and (now - st["since"] < debounce or None in stamps.values()):
+                    continue  # still being written, or missing while it is replaced
+                ran = st["ran"] or {}
+                changed = [path for path, stamp in stamps.items() if ran.get(path) != stamp]
+                hashes = {path: _hash(path) for path in changed}
+                st["ran"] = stamps
+                if all(path in st["hashes"] and st["hashes"][path] == h for path, h in hashes.items()):
+                    continue  # touched, not changed
+                st["hashes"].update(hashes)
+                cycle += 1
+                result = run_setup(fname, load_workers, force, param_workers, sessions)
+                # latency: from the last write of a changed input to the new output
+                written = max((stamps[p][0] / 1e9 for p in changed if stamps[p]), default=None)
+                done = time.time()
+                if report is not None:
+                    report({"cycle": cycle, "setup": fname, "ok": result["ok"],
+                            "changed": changed, "reloaded": list(result["load"]),
+                            "rows": result["rows"], "seconds": result["seconds"],
+                            "latency": None if ran == {} or written is None
+                            else round(done - written, 3),
+                            "error": result["error"]})
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for session in sessions.values():
+            session.close()
+
+
+def _hash(path):
+    try:
+        return content_hash(path)
+    except OSError:
+        return None
+
+
+def read_runs(path):
+    ''' the run traces in a RUN_LOG file, unreadable lines are skipped '''
+    runs = []
+    with open(path, "r", encoding="utf-8") as fin:
+        for line in fin:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                continue  # e.g. a line cut short by a crash
+    return runs
+
+
+def report(runs, top=10):
+    ''' text summary of where the time of runs went: totals per stage,
+    the slowest setups, stages and queries (with their query plans) '''
+    if not runs:
+        return "no runs recorded"
+    lines = []
+    cached = sum(1 for r in runs if r.get("cached"))
+    peak = max((_run_peak(r) for r in runs), default=0)
+    lines.append(f"runs: {len(runs)} ({cached} from the result cache), "
+                 f"{runs[0].get('time', '?')} .. {runs[-1].get('time', '?')}")
+    lines.append(f"total: {sum(r.get('seconds', 0) for r in runs):.2f}s  peak memory: {peak:,.1f} MB"
+                 + ("" if all("peak_rss_mb" in r for r in runs) else " (process-wide)"))
+
+    stages = [dict(s, setup=r.get("setup")) for r in runs for s in r.get("stages", [])]
+    totals = {}
+    for s in stages:
+        count, seconds, rows = totals.get(s["stage"], (0, 0.0, 0))
+        totals[s["stage"]] = (count + 1, seconds + s["seconds"], rows + (s.get("rows") or 0))
+    everything = sum(seconds for count, seconds, rows in totals.values()) or 1
+    lines += ["", f"{'stage':<10} {'count':>6} {'seconds':>10} {'share':>7} {'rows':>14}"]
+    for stage, (count, seconds, rows) in sorted(totals.items(), key=lambda t: -t[1][1]):
+        lines.append(f"{stage:<10} {count:>6} {seconds:>10.2f} {100 * seconds / everything:>6.1f}% {rows:>14,}")
+
+    setups = {}
+    for r in runs:
+        count, seconds, mb = setups.get(r.get("setup"), (0, 0.0, 0.0))
+        setups[r.get("setup")] = (count + 1, seconds + r.get("seconds", 0), max(mb, _run_peak(r)))
+    lines += ["", "slowest setups (mean seconds per run, peak memory)"]
+    for setup, (count, seconds, mb) in sorted(setups.items(), key=lambda t: -t[1][1] / t[1][0])[:top]:
+        lines.append(f"{seconds / count:>9.2f}s  {count:>4} runs  {mb:>8,.1f} MB  {setup or '(unsaved)'}")
+
+    lines += ["", "slowest stages"]
+    for s in sorted(stages, key=lambda s: -s["seconds"])[:top]:
+        notes = [] if s.get("rows") is None else [f"{s['rows']:,} rows"]
+        if "cache" in s:
+            notes.append(f"cache {s['cache']}")
+        if s.get("file"):
+            notes.append(s["file"])
+        lines.append(f"{s['seconds']:>9.2f}s  {s['stage']:<9} {_subject(s)}  ({', '.join(notes)})")
+
+    growth = [(_stage_growth(s), s) for s in stages]
+    growth = [(mb, s) for mb, s in growth if mb is not None and mb > 0]
+    if growth:
+        lines += ["", "stages using the most memory (MB above the stage before)"]
+        for mb, s in sorted(growth, key=lambda t: -t[0])[:top]:
+            lines.append(f"{mb:>9,.1f}  {s['stage']:<9} {_subject(s)}  ({s.get('setup') or '(unsaved)'})")
+
+    queries = [s for s in stages if "plan" in s]
+    if queries:
+        lines += ["", "slowest queries and their plans (SCAN = no index used)"]
+        for s in sorted(queries, key=lambda s: -s["seconds"])[:min(top, 5)]:
+            lines.append(f"{s['seconds']:>9.2f}s  {s['stage']:<9} {_subject(s)}")
+            lines += ["             " + step for step in s["plan"]]
+    return "\n".join(lines)
+
+
+def _run_peak(run):
+    # the run's own peak, or the process peak where it could not be reset
+    return run.get("peak_rss_mb") or run.get("process_peak_rss_mb") or 0
+
+
+def _stage_growth(stage):
+    # memory the stage needed on top of what was resident before it
+    if stage.get("rss_mb") is None or stage.get("rss_delta_mb") is None:
+        return None
+    before = stage["rss_mb"] - stage["rss_delta_mb"]
+    return round((stage.get("peak_rss_mb") or stage["rss_mb"]) - before, 1)
+
+
+def _subject(stage):
+    # the table, output file or statement a stage worked on
+    if stage.get("table") or stage.get("output"):
+        return stage.get("table") or stage.get("output")
+    return " ".join(stage.get("sql", "").split())[:60]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="sqlbatch.py",
+                                     description="Run saved SQLcells query setups without the GUI")
+    parser.add_argument("setups", nargs="*", help="setup files or directories of setup files")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("--load-workers", type=int, default=1,
+                        help="processes parsing the inputs of each setup (default: 1)")
+    parser.add_argument("--param-workers", type=int, default=1,
+                        help="outputs of a PARAMS setup written at the same time (default: 1)")
+    parser.add_argument("--force", action="store_true",
+                        help="run every query, do not reuse cached results")
+    parser.add_argument("--summary", help="write the JSON summary to this file instead of stdout")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running, re-run a setup whenever its inputs change")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="watch: seconds between checks of the inputs (default: 1)")
+    parser.add_argument("--debounce", type=float, default=2.0,
+                        help="watch: seconds an input must stay unchanged (default: 2)")
+    parser.add_argument("--report", nargs="?", const=RUN_LOG, metavar="FILE",
+                        help=f"summarize the traced runs in FILE (default: {RUN_LOG}) and exit")
+    args = parser.parse_args(argv)
+
+    if args.report:
+        # relative to the sqlcells directory, where the runs are traced
+        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), args.report)
+        try:
+            print(report(read_runs(path)))
+        except OSError as e:
+            print(f"sqlbatch.py: {e}", file=sys.stderr)
+            return 2
+        return 0
+
+    setups = find_setups(args.setups)
+    if not setups:
+        print("sqlbatch.py: no setup files found", file=sys.stderr)
+        return 2
+    summary_file = os.path.abspath(args.summary) if args.summary else None
+
+    # relative paths in setup files are relative to the sqlcells directory
+    os.chdir(os.path.dirname(os.path.realpath(__file__)))
+    if args.watch:
+        def report_cycle(cycle):
+            line = json.dumps(cycle)
+            if summary_file:
+                with open(summary_file, "a", encoding="utf-8") as fout:
+                    fout.write(line + "\n")
+            else:
+                print(line, flush=True)
+        watch(setups, args.interval, args.debounce, args.load_workers, args.force,
+              args.param_workers, report_cycle)
+        return 0
+    summary = run_batch(setups, args.jobs, args.load_workers, args.force, args.param_workers)
+
+    text = json.dumps(summary, indent=2)
+    if summary_file:
+        with open(summary_file, "w", encoding="utf-8") as fout:
+            fout.write(text + "\n")
+    else:
+        print(text)
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,23 +16,29 @@ from tkinter import Listbox
 from tkinter import filedialog
 from tkinter import messagebox
 from tkinter import simpledialog
-from datetime import datetime
 import subprocess
 import platform
-import pandas as pd
-import pandasql as psql
-import sqlite3
 import threading
+import queue
+import time
 from ttkbootstrap import *
 from ttkbootstrap.constants import *
 from ttkbootstrap.tooltip import ToolTip
 from ttkbootstrap.toast import ToastNotification
+from sqlhilite import Highlighter
+from sqlgrid import ResultGrid
+from sqlengine import FrameCache, Session, ResultCache, parse_item
+from sqlengine import read_setup, write_setup, strip_remarks, append_log
+from sqlengine import inspect_text, sheet_names, file_type
+from sqlengine import run_pipeline, run_notes, split_outputs, driving_queries
+from sqlengine import param_grid, load_heads, fetch_rows, RunTrace
+from sqlengine import PREVIEW_INPUT_ROWS, PREVIEW_ROWS
+from sqlengine import WORK_DB, STREAM_CSV_MB, OUTPUT_TYPES, throughput
 
 cdf = ""
 cfile = ""
 ctype = ""
-d1, d2, d3, d4, d5, d6, d7 = "", "", "", "", "", "", ""
-# ds = []
+csheet = None
 toast = ToastNotification(
     title="SQLcells",
     message="Query Setup Saved!",
@@ -48,6 +54,18 @@ class Application(Frame):
         Frame.__init__(self, parent)
         self.pack(fill=BOTH, expand=True, padx=4, pady=4)
         self.savefile = ""
+        self.cache = FrameCache()  # parsed input files
+        self.session = None  # kept between submits when Keep is checked
+        self.stream = False  # STREAM in the setup file: always stream csv inputs
+        self.refresh = False  # REFRESH in the setup file: never reuse a cached result
+        self.compact = False  # COMPACT in the setup file: shrink the loaded tables
+        self.params = {}  # PARAMS in the setup file: one output per :name value
+        self.results = ResultCache()  # output files of earlier submits
+        self.preview_session = None  # heads of the inputs, kept between previews
+        self.preview_window = None
+        self.job = None  # the submit running on the worker thread
+        self.messages = queue.Queue()  # worker thread -> Tk thread
+        self.cancelled = threading.Event()
         self.create_widgets()
 
     def create_widgets(self):
@@ -115,32 +133,54 @@ class Application(Frame):
         frm3 = Frame(self)
         frm3.grid(row=5, column=1)
 
-        btn_submit = Button(frm3, text='Submit', bootstyle="outline", command=self.on_submit)
-        btn_submit.grid(row=1, column=1, padx=8, pady=4)
-        ToolTip(btn_submit, text="run the query")
+        self.btn_submit = Button(frm3, text='Submit', bootstyle="outline", command=self.on_submit)
+        self.btn_submit.grid(row=1, column=1, padx=8, pady=4)
+        ToolTip(self.btn_submit, text="run the query")
+
+        self.btn_preview = Button(frm3, text='Preview', bootstyle="outline", command=self.on_preview)
+        self.btn_preview.grid(row=1, column=2, padx=8, pady=4)
+        ToolTip(self.btn_preview, text="show the first result rows, from the first rows of each input")
 
         self.vckbox = IntVar()
         ckbox = Checkbutton(frm3, variable=self.vckbox, text='Launch')
-        ckbox.grid(row=1, column=3, padx=8, pady=4)
+        ckbox.grid(row=1, column=4, padx=8, pady=4)
         ToolTip(ckbox, text="open resulting query in LibreOffice Calc")
 
         self.vSckbox = IntVar()
         Sckbox = Checkbutton(frm3, variable=self.vSckbox, text=' Log ')
-        Sckbox.grid(row=1, column=4, padx=8, pady=4)
+        Sckbox.grid(row=1, column=5, padx=8, pady=4)
         ToolTip(Sckbox, text="record the query setup in the log file")
 
+        self.vKckbox = IntVar()
+        Kckbox = Checkbutton(frm3, variable=self.vKckbox, text='Keep')
+        Kckbox.grid(row=1, column=3, padx=8, pady=4)
+        ToolTip(Kckbox, text="keep tables loaded between submits")
+
         btn_save = Button(frm3, text='Save', bootstyle="outline", command=self.on_save)
-        btn_save.grid(row=1, column=5, padx=8, pady=4)
+        btn_save.grid(row=1, column=6, padx=8, pady=4)
         ToolTip(btn_save, text="Save this query setup to a file")
 
         btn_open = Button(frm3, text='Open', bootstyle="outline", command=self.on_open)
-        btn_open.grid(row=1, column=6, padx=8, pady=4)
+        btn_open.grid(row=1, column=7, padx=8, pady=4)
         ToolTip(btn_open, text="Open a saved query setup file")
 
         btn_close = Button(frm3, text='Close', bootstyle="outline", command=self.on_exit)
-        btn_close.grid(row=1, column=7, padx=8, pady=4)
+        btn_close.grid(row=1, column=8, padx=8, pady=4)
         ToolTip(btn_close, text="Ctrl-Q")
 
+        frm4 = Frame(self)
+        frm4.grid(row=6, column=1, sticky="ew")
+        frm4.columnconfigure(1, weight=1)
+
+        self.vstatus = StringVar()
+        lbl_status = Label(frm4, textvariable=self.vstatus)
+        lbl_status.grid(row=1, column=1, sticky="w")
+
+        self.btn_cancel = Button(frm4, text='Cancel', bootstyle="outline", command=self.on_cancel,
+                                 state=DISABLED)
+        self.btn_cancel.grid(row=1, column=2, padx=8, pady=4)
+        ToolTip(self.btn_cancel, text="stop the running query")
+
         root.bind("<Control-q>", self.on_exit)
         root.bind("<Control-s>", self.quicksave)
 
@@ -148,7 +188,7 @@ class Application(Frame):
         # simply use a saved SQL setup file as argument 1
         if len(sys.argv) > 1:
             self.read_saved_query(sys.argv[1])
-            self.on_submit()
+            self.on_submit(background=False)
             self.on_exit()
         else:
             if os.path.isfile("lastquery"):
@@ -161,10 +201,12 @@ class Application(Frame):
         # txt fg = #DEE
         self.sqltext.tag_configure("literals",foreground="darkorange")
         self.sqltext.tag_configure("remarks", foreground="gray")
+        self.sqltext.tag_configure("keywords", foreground="#6cb6ff")
+        self.sqltext.tag_configure("functions", foreground="violet")
 
         ###################################################################
 
-        self.highlite()  # starts off syntax highliting thread
+        self.highlighter = Highlighter(self.sqltext)  # re-highlights edited lines
 
     # ----------------------------------------------------------------------------
 
@@ -198,22 +240,45 @@ class Application(Frame):
 
 
     def on_input(self):
-        ''' set an input table (csv or excel file) '''
+        ''' set an input table (csv, excel or sqlite file) '''
         fname =  filedialog.askopenfilename(initialdir = p,
                                             title = "Open file",
                                             filetypes = (("xlsx files","*.xls*"),
-                                            ("csv files","*.csv"),("all files","*.*")))
+                                            ("csv files","*.csv"),
+                                            ("sqlite files","*.db *.sqlite"),("all files","*.*")))
         if fname:
             try:
-                s = self.lstn.size()
-                if s >= 7:
-                    messagebox.showwarning("Input Limit", "7 inputs max")
-                    return
-                d = "d" + str(s + 1)
-                self.lstn.insert(tk.END, d + ": " + fname)
+                sheets = [None]
+                if file_type(fname) == "xls":
+                    names = sheet_names(fname)
+                    if len(names) > 1:
+                        sheets = self.choose_sheets(fname, names)
+                for sheet in sheets:
+                    d = "d" + str(self.lstn.size() + 1)
+                    item = fname if sheet is None else f"{fname}[{sheet}]"
+                    self.lstn.insert(tk.END, d + ": " + item)
             except:
                 messagebox.showerror("Open File", "Failed to open file\n'%s'" % fname)
 
+    def choose_sheets(self, fname, names):
+        ''' ask which sheets of a workbook become tables, returns their names '''
+        chosen = []
+        t = Toplevel(self)
+        t.wm_title(os.path.basename(fname))
+        Label(t, text="Sheets to add as tables").grid(row=0, column=0, padx=10, pady=5)
+        lst = Listbox(t, selectmode=EXTENDED, exportselection=False, height=min(len(names), 15))
+        lst.grid(row=1, column=0, sticky="nsew", padx=10)
+        for name in names:
+            lst.insert(tk.END, name)
+        lst.selection_set(0)
+        def on_ok():
+            chosen.extend(names[i] for i in lst.curselection())
+            t.destroy()
+        Button(t, text="OK", command=on_ok).grid(row=2, column=0, sticky="sew", padx=5, pady=5)
+        t.grab_set()
+        self.wait_window(t)
+        return chosen
+
     def on_output(self):
         ''' select an output file (xlsx or csv) for the query '''
         path = self.lstn.get(0)
@@ -230,10 +295,13 @@ class Application(Frame):
         ''' Remove all input files from the list '''
         self.lstn.delete(0, tk.END)
 
-    def on_submit(self):
+    def on_submit(self, background=True):
         ''' load the data frames and execute the SQL
         optionally launch the result and optionally
-        log the query information '''
+        log the query information
+        the work runs on a worker thread unless background=False '''
+        if self.job is not None:
+            return  # a query is already running
         outfile = self.ventr.get()
         if outfile == "":
             messagebox.showerror("Output", "Output file missing")
@@ -248,38 +316,218 @@ class Application(Frame):
             return
 
         # Filter out query lines that start with #
-        lines = query.splitlines()
-        sql_lines = [line for line in lines if not line.lstrip().startswith("#")]
-        query = "\n".join(sql_lines)
+        query = strip_remarks(query)
+
+        # several outputs are separated by ; - one per SELECT in the script
+        for out in split_outputs(outfile):
+            if not out.endswith(OUTPUT_TYPES):
+                messagebox.showerror("Unsupported file format", "The specified file format is not supported.")
+                return
+
+        # large csv inputs are streamed into an on-disk working database
+        stream = self.stream or self.large_csv_input()
+        dbpath = WORK_DB if stream else ":memory:"
+        # Keep reuses one sqlite session, tables are only
+        # reloaded when their input file changed
+        if self.vKckbox.get() == 1:
+            if self.session is not None and self.session.dbpath != dbpath:
+                self.session.close()
+                self.session = None
+            if self.session is None:
+                self.session = Session(dbpath)
+            session = self.session
+        else:
+            session = Session(dbpath)
+
+        # everything the worker needs is read from the widgets here
+        self.job = {"session": session,
+                    "items": list(self.lstn.get(0, tk.END)),
+                    "query": query,
+                    "outfile": outfile,
+                    "stream": stream,
+                    "start": time.perf_counter(),
+                    "compact": self.compact,
+                    "params": dict(self.params),
+                    "trace": RunTrace(setup=self.savefile or None, sql=query[:500])}
+        self.cache.reset_counters()
+        self.cancelled.clear()
+        if background:
+            self.start_job(self.run_query)
+        else:
+            self.run_query(self.job)
+            self.poll_queue()
+
+    def start_job(self, target):
+        ''' run target(self.job) on a worker thread '''
+        self.btn_submit.configure(state=DISABLED)
+        self.btn_preview.configure(state=DISABLED)
+        self.btn_cancel.configure(state=NORMAL)
+        threading.Thread(target=target, args=(self.job,), daemon=True).start()
+        self.after(100, self.poll_queue)
+
+    def on_preview(self):
+        ''' run the query on the first PREVIEW_INPUT_ROWS rows of every
+        input and show up to PREVIEW_ROWS result rows in a grid window,
+        no output file is written '''
+        if self.job is not None:
+            return  # a query is already running
+        if self.lstn.size() == 0:
+            messagebox.showerror("Input", "Input files missing")
+            return
+        query = self.sqltext.get("1.0", END)
+        if len(query) < 5:
+            messagebox.showerror("Query", "Query Code missing")
+            return
+        if self.preview_session is None:
+            self.preview_session = Session()
+        self.job = {"session": self.preview_session,
+                    "items": list(self.lstn.get(0, tk.END)),
+                    "query": strip_remarks(query),
+                    "params": dict(self.params),
+                    "start": time.perf_counter(),
+                    "preview": True,
+                    "first": None,  # seconds until the first rows arrived
+                    "rows": [],  # filled by the worker, read by the grid
+                    "grid": None,
+                    "timings": {}}
+        self.cancelled.clear()
+        self.vstatus.set("preview ...")
+        self.start_job(self.run_preview)
+
+    def run_preview(self, job):
+        ''' worker thread: run the preview query, the rows are appended
+        to job["rows"] batch by batch, the grid shows them as they arrive '''
+        session = job["session"]
+        try:
+            # driving queries of the PARAMS read tables too
+            used = "\n".join([job["query"]] + driving_queries(job["params"]))
+            job["timings"] = load_heads(session, job["items"], self.cache, used)
+            params = None
+            if job["params"]:
+                grid = param_grid(session.conn, job["params"])
+                params = grid[0] if grid else None  # the first combination
+            session.watch(self.cancelled.is_set)
+            for header, rows in fetch_rows(session.conn, job["query"], params=params):
+                job["rows"].extend(rows)
+                if job["first"] is None:
+                    job["first"] = time.perf_counter() - job["start"]
+                    self.messages.put(("first", header))
+            self.messages.put(("done", (len(job["rows"]), time.perf_counter() - job["start"])))
+        except Exception as e:
+            if self.cancelled.is_set():
+                self.messages.put(("cancelled", None))
+            else:
+                self.messages.put(("error", e))
+        finally:
+            session.watch(None)
+
+    def show_preview(self, job, header):
+        ''' open the grid window over the preview rows '''
+        if self.preview_window is not None and self.preview_window.winfo_exists():
+            self.preview_window.destroy()
+        t = self.preview_window = Toplevel(self)
+        t.wm_title("Preview")
+        t.geometry("900x500")
+        job["grid"] = ResultGrid(t, header, job["rows"])
+        job["grid"].pack(fill=BOTH, expand=True, padx=4, pady=4)
+        self.vstatus.set(f"preview: first row after {job['first']:.2f}s ...")
+
+    def run_query(self, job):
+        ''' worker thread: load the tables, execute the SQL and write
+        the output file - no Tk calls here, results go to self.messages '''
+        session = job["session"]
+        last = [0.0]
+
+        def progress():
+            # sqlite progress handler, a true return value aborts the query
+            now = time.perf_counter()
+            if now - last[0] > 0.2:
+                last[0] = now
+                self.messages.put(("status", f"running query ... {now - job['start']:.1f}s"))
+            return self.cancelled.is_set()
+
+        def ingested(name, rows):
+            if self.cancelled.is_set():
+                raise InterruptedError("cancelled")
+            self.messages.put(("status", f"{name}: {rows:,} rows ingested"))
 
-        self.load_data_frames()
-        # now get the SQL code and execute
         try:
-            result_df = psql.sqldf(query, globals())
+            # the outputs are written one after another on this
+            # connection, so Cancel stops them
+            job["run"] = run = run_pipeline(
+                session, job["items"], job["query"], job["outfile"], self.cache, self.results,
+                job["params"], self.refresh, job["stream"], job["compact"], param_workers=1,
+                ingested=ingested, watch=progress, cancelled=self.cancelled.is_set,
+                trace=job["trace"], kept=session is self.session)
+            # an unchanged query on unchanged inputs reused the earlier outputs
+            seconds = time.perf_counter() - job["start"] if run["cached"] else run["seconds"]
+            self.messages.put(("done", (run["rows"], seconds)))
         except Exception as e:
-            messagebox.showerror("An error occurred", e)
+            if self.cancelled.is_set():
+                self.messages.put(("cancelled", None))
+            else:
+                self.messages.put(("error", e))
+        finally:
+            if session is not self.session:
+                session.close()
+
+    def poll_queue(self):
+        ''' Tk thread: handle the messages posted by run_query '''
+        while True:
+            try:
+                kind, value = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "status":
+                self.vstatus.set(value)
+                continue
+            if kind == "first":
+                self.show_preview(self.job, value)
+                continue
+            job, self.job = self.job, None
+            self.btn_submit.configure(state=NORMAL)
+            self.btn_preview.configure(state=NORMAL)
+            self.btn_cancel.configure(state=DISABLED)
+            if job.get("grid") is not None:
+                job["grid"].done()
+            if kind == "done":
+                self.on_query_done(job, *value)
+            elif kind == "cancelled":
+                self.vstatus.set("query cancelled")
+            else:
+                self.vstatus.set("")
+                messagebox.showerror("An error occurred", value)
             return
-        # now create output file and optionally launch it
-        if outfile.endswith((".xlsx", ".xls")):
-            result_df.to_excel(outfile, index=False)  # save to new spreadsheet
-        elif outfile.endswith(".csv"):
-            result_df.to_csv(outfile)
-        elif outfile.endswith((".sqlite", ".db")):
-            # Export to SQLite Database
-            # Connect to (or create) the SQLite database
-            conn = sqlite3.connect(outfile)
-            # Choose a table name, e.g., 'result_table'. You can make this dynamic if needed.
-            table_name = 'result_table'
-            # Write the DataFrame to the SQLite table
-            result_df.to_sql(table_name, conn, if_exists='replace', index=False)
-            # Commit changes and close the connection
-            conn.commit()
-            conn.close()
-        else:
-            messagebox.showerror("Unsupported file format", "The specified file format is not supported.")
+        self.after(100, self.poll_queue)
+
+    def on_cancel(self):
+        ''' stop the running query '''
+        if self.job is not None:
+            self.cancelled.set()
+            self.job["session"].interrupt()
+            self.vstatus.set("cancelling ...")
+
+    def on_query_done(self, job, rows, seconds):
+        ''' optionally launch the result and log the query information '''
+        if job.get("preview"):
+            capped = f" (capped at {PREVIEW_ROWS:,})" if rows >= PREVIEW_ROWS else ""
+            self.vstatus.set(f"preview: {rows:,} rows{capped}, first row after {job['first']:.2f}s"
+                             f" - from the first {PREVIEW_INPUT_ROWS:,} rows of each input")
             return
+        run = job["run"]
+        query, outputs = job["query"], run["outputs"]
+        if run["cached"]:
+            self.vstatus.set(f"unchanged: {rows:,} rows reused from the result cache")
+        elif len(outputs) != 1:
+            self.vstatus.set(f"{len(outputs)} outputs, " + throughput(rows, seconds))
+        else:
+            self.vstatus.set(throughput(rows, seconds))
+        # the first output is launched, None when a driving query found no values
+        outfile = outputs[0][0] if outputs else None
         # check to see if launch spreadsheet requested
-        if outfile.endswith((".sqlite", ".db")):
+        if outfile is None:
+            pass
+        elif outfile.endswith((".sqlite", ".db")):
             messagebox.showinfo("Sqlite", "Database with result_table was created")
         elif self.vckbox.get() == 1:
             # NOTE: outfile must be a fullpath
@@ -293,94 +541,50 @@ class Application(Frame):
 
         # check to see if logging requested
         if self.vSckbox.get() == 1:
-            with open("sqllog.txt", "a", encoding='utf-8') as fout:
-                fout.write(str(datetime.today()) + "\n\n")
-                items = list(self.lstn.get(0, tk.END))
-                for f in items:
-                    fout.write(f + "\n")
-                fout.write("\n" + query.strip() + "\n\n" + outfile + "\n-------------------------------------\n")
+            append_log(job["items"], query, job["outfile"], run_notes(run, self.cache))
+            job["trace"].write(cached=run["cached"], rows=rows,
+                               outputs=[out for out, n, s, hit in outputs])
 
     def parse_input(self, strg):
         ''' split out the data frame name file path,
-        and file type into cdf and cfile global vars '''
-        global cdf, cfile, ctype
-        items = strg.split(": ")
-        if len(items) == 0:
+        file type and sheet into the cdf, cfile, ctype, csheet global vars '''
+        global cdf, cfile, ctype, csheet
+        if ": " not in strg:
             return
-        cdf = items[0]
-        cfile = items[1]
-        if cfile.endswith("xlsx") or cfile.endswith("xls"):
-            ctype = "xls"
-        elif cfile.endswith("csv"):
-            ctype = "csv"
-        else:
+        cdf, cfile, ctype, csheet = parse_item(strg)
+        if ctype == "":
             messagebox.showerror("Error", "invalid file type")
 
-    def load_data_frames(self):
-        ''' load data frames from the list of input files (tables)
-        using global vars d1 ... d6 - MAX 6 files '''
-        global d1, d2, d3, d4, d5, d6, d7
-        ds = []
-        # ds.clear()
-        items = list(self.lstn.get(0, tk.END))
-        for f in items:
+    def large_csv_input(self):
+        ''' True when a csv input is larger than STREAM_CSV_MB '''
+        for f in self.lstn.get(0, tk.END):
             self.parse_input(f)
-            if ctype == "csv":
-                df = pd.read_csv(cfile)
-            else:
-                df = pd.read_excel(cfile)
-            ds.append(df)
-        # d1, d2, d3, d4, d5 ... = ds[0], ds[1], ds[2], ds[3], ds[4] ...
-        nds = len(items)
-        if nds == 1:
-            d1 = ds[0]
-        elif nds == 2:
-            d1, d2 = ds[0], ds[1]
-        elif nds == 3:
-            d1, d2, d3 = ds[0], ds[1], ds[2]
-        elif nds == 4:
-            d1, d2, d3, d4 = ds[0], ds[1], ds[2], ds[3]
-        elif nds == 5:
-            d1, d2, d3, d4, d5 = ds[0], ds[1], ds[2], ds[3], ds[4]
-        elif nds == 6:
-            d1, d2, d3, d4, d5, d6 = ds[0], ds[1], ds[2], ds[3], ds[4], ds[5]
-        elif nds == 7:
-            d1, d2, d3, d4, d5, d6, d7 = ds[0], ds[1], ds[2], ds[3], ds[4], ds[5], ds[6]
+            if ctype == "csv" and os.path.getsize(cfile) > STREAM_CSV_MB * 1024 * 1024:
+                return True
+        return False
 
     def read_saved_query(self, filepath):
         ''' reads file of saved query code and displays in user's GUI '''
-        code = ""
         self.savefile = filepath # for quicksave
         try:
-            with open(filepath, "r", encoding='utf-8') as fin:
-                line = fin.readline().strip()
-                if line != "sqlcells":
-                    messagebox.showerror("Reading File Error", "Re-check the FILE TYPE")
-                    return
-                line = fin.readline().strip()
-                self.on_clear()
-                while line != "SQL":
-                    self.lstn.insert(tk.END, line)
-                    line = fin.readline().strip()
-                while True:
-                    line = fin.readline()  # now reading the SQL lines (with EOLs)
-                    if line == '' or line.startswith("OUTPUT"):
-                        break
-                    code += line  # concatenate all the SQL lines
-                path = fin.readline().strip() # read the output path
-                # now read until end of file checking for LAUNCH and LOG
-                while line != '':
-                    line = fin.readline().strip()
-                    if line == "LAUNCH":
-                        self.vckbox.set(1)
-                    if line == "LOG":
-                        self.vSckbox.set(1)
+            setup = read_setup(filepath)
         except:
             messagebox.showerror("Reading File Error", "Re-check the FILE TYPE")
             return
+        self.on_clear()
+        for line in setup["inputs"]:
+            self.lstn.insert(tk.END, line)
+        options = setup["options"]
+        self.vckbox.set(int("LAUNCH" in options))
+        self.vSckbox.set(int("LOG" in options))
+        self.vKckbox.set(int("KEEP" in options))
+        self.stream = "STREAM" in options
+        self.refresh = "REFRESH" in options
+        self.compact = "COMPACT" in options
+        self.params = setup["params"]
         self.sqltext.delete("1.0", END)  # clear the Text widget
-        self.sqltext.insert(1.0, code.strip())  # insert the SQL code
-        self.ventr.set(path)  # output path
+        self.sqltext.insert(1.0, setup["sql"])  # insert the SQL code
+        self.ventr.set(setup["output"])  # output path
         root.title(f"SQLcells--> {os.path.basename(self.savefile)}")
 
     def save_query(self, filepath):
@@ -389,21 +593,24 @@ class Application(Frame):
             messagebox.showwarning("Saving Query Code", "Incorrect File Type!")
             return
         self.savefile = filepath  # for quicksave
-        with open(filepath, "w", encoding='utf-8') as fout:
-            fout.write("sqlcells\n")  # identifies saved query files
-            items = list(self.lstn.get(0, tk.END))
-            for line in items:
-                fout.write(line + "\n")
-            fout.write("SQL" + "\n")
-            sql = self.sqltext.get("1.0", END)
-            fout.write(sql)
-            fout.write("OUTPUT" + "\n")
-            outfile = self.ventr.get()
-            fout.write(outfile + "\n")
-            if self.vckbox.get() == 1:
-                fout.write("LAUNCH" + "\n")
-            if self.vSckbox.get() == 1:
-                fout.write("LOG" + "\n")
+        options = set()
+        if self.vckbox.get() == 1:
+            options.add("LAUNCH")
+        if self.vSckbox.get() == 1:
+            options.add("LOG")
+        if self.vKckbox.get() == 1:
+            options.add("KEEP")
+        if self.stream:
+            options.add("STREAM")
+        if self.refresh:
+            options.add("REFRESH")
+        if self.compact:
+            options.add("COMPACT")
+        write_setup(filepath, {"inputs": list(self.lstn.get(0, tk.END)),
+                               "sql": self.sqltext.get("1.0", END),
+                               "output": self.ventr.get(),
+                               "options": options,
+                               "params": self.params})
         toast.show_toast()
 
     def on_exit(self, e=None):
@@ -433,6 +640,8 @@ class Application(Frame):
                             parent=self,
                             initialvalue=1)
         self.parse_input(list_item)
+        if request == 1 and ctype == "db":
+            request = 2  # no spreadsheet to open, show the tables
         if request == 1:
             # NOTE: outfile must be a fullpath
             if platform.system() == 'Windows':
@@ -443,92 +652,60 @@ class Application(Frame):
                 subprocess.Popen(['libreoffice', '--calc', cfile])
                 # subprocess.Popen(["/usr/bin/onlyoffice-desktopeditors", cfile])
         elif request == 2:
-            if ctype == "csv":
-                df = pd.read_csv(cfile)
-            else:
-                df = pd.read_excel(cfile)
-            self.info_window(df.dtypes)
+            info = self.cache.inspect(cfile, ctype, csheet)
+            title = cfile if csheet is None else f"{cfile}[{csheet}]"
+            self.info_window(inspect_text(title, info))
 
-    def info_window(self, dframe):
-        ''' user want to see column names/types '''
+    def info_window(self, info):
+        ''' user want to see column names/types and statistics '''
         t = Toplevel(self)
         t.wm_title("Info")
-        l = Label(t, text=dframe)
+        l = Label(t, text=info, font="TkFixedFont")
         l.grid(row=0, column=0, padx=10, pady=10)
         btn = Button(t, text="Close", command = t.destroy)
         btn.grid(row=1, column=0, sticky='sew', padx=5, pady=5)
 
 
-    # SQL code hilighting for literals and remarks follows
-
-    def highlite(self):
-        global t
-
-        self.highlight_pattern(r"(#.*|//.*)\n", "remarks", regexp=True)
-
-        self.highlight_pattern(r"[\"\'`]((?:.|\n)*?)[\'\"`]",
-                               "literals", regexp=True)
-
-        t = threading.Timer(1.25, self.highlite)  # every 1.5 seconds
-        t.daemon = True  # for threading runtime error
-        t.start()
-
-    def highlight_pattern(self, pattern, tag, start="1.0", end="end", regexp=False):
-        start = self.sqltext.index(start)
-        end = self.sqltext.index(end)
-        self.sqltext.tag_remove(tag, start, end)
-        self.sqltext.mark_set("matchStart", start)
-        self.sqltext.mark_set("matchEnd", start)
-        self.sqltext.mark_set("searchLimit", end)
-
-        count = IntVar()
-        while True:
-            index = self.sqltext.search(pattern, "matchEnd","searchLimit",
-                                count=count, regexp=True)
-            if index == "": break
-            if count.get() == 0: break # degenerate pattern zero-length strings
-            self.sqltext.mark_set("matchStart", index)
-            self.sqltext.mark_set("matchEnd", "%s+%sc" % (index, count.get()))
-            self.sqltext.tag_add(tag, "matchStart", "matchEnd")
-
-
-# change working directory to path for this file
-p = os.path.realpath(__file__)
-os.chdir(os.path.dirname(p))
-
-# THEMES
-# 'cosmo', 'flatly', 'litera', 'minty', 'lumen',
-# 'sandstone', 'yeti', 'pulse', 'united', 'morph',
-# 'journal', 'darkly', 'superhero', 'solar', 'cyborg',
-# 'vapor', 'simplex', 'cerculean'
-root = Window("SQLcells", "darkly", size=(673, 372))
-
-# UNCOMMENT THE FOLLOWING TO SAVE GEOMETRY INFO
-def save_location(e=None):
-    ''' executes at WM_DELETE_WINDOW event - see below '''
-    with open("winfo", "w", encoding='utf-8') as fout:
-        fout.write(root.geometry())
-    root.destroy()
-
-# UNCOMMENT THE FOLLOWING TO SAVE GEOMETRY INFO
-if os.path.isfile("winfo"):
-    with open("winfo") as z:
-        lcoor = z.read()
-    root.geometry(lcoor.strip())
-else:
-    root.geometry("673x372") # WxH+left+top
-
-
-root.protocol("WM_DELETE_WINDOW", save_location)  # UNCOMMENT TO SAVE GEOMETRY INFO
-Sizegrip(root).place(rely=1.0, relx=1.0, x=0, y=0, anchor='se')
-# root.resizable(0, 0) # no resize & removes maximize button
-root.minsize(650, 375)  # width, height
-# root.maxsize(680, 379)
-# root.overrideredirect(True) # removed window decorations
-# root.attributes('-type', 'splash')  # don't show in taskbar
-# root.iconphoto(False, PhotoImage(file='icon.png'))
-# root.attributes("-topmost", True)  # Keep on top of other windows
-
-Application(root)
-
-root.mainloop()
\ No newline at end of file
+# worker processes that parse inputs in parallel re-import this
+# file where processes are spawned (Windows, macOS): no GUI for them
+if __name__ == "__main__":
+    # change working directory to path for this file
+    p = os.path.realpath(__file__)
+    os.chdir(os.path.dirname(p))
+
+    # THEMES
+    # 'cosmo', 'flatly', 'litera', 'minty', 'lumen',
+    # 'sandstone', 'yeti', 'pulse', 'united', 'morph',
+    # 'journal', 'darkly', 'superhero', 'solar', 'cyborg',
+    # 'vapor', 'simplex', 'cerculean'
+    root = Window("SQLcells", "darkly", size=(673, 372))
+
+    # UNCOMMENT THE FOLLOWING TO SAVE GEOMETRY INFO
+    def save_location(e=None):
+        ''' executes at WM_DELETE_WINDOW event - see below '''
+        with open("winfo", "w", encoding='utf-8') as fout:
+            fout.write(root.geometry())
+        root.destroy()
+
+    # UNCOMMENT THE FOLLOWING TO SAVE GEOMETRY INFO
+    if os.path.isfile("winfo"):
+        with open("winfo") as z:
+            lcoor = z.read()
+        root.geometry(lcoor.strip())
+    else:
+        root.geometry("673x372") # WxH+left+top
+
+
+    root.protocol("WM_DELETE_WINDOW", save_location)  # UNCOMMENT TO SAVE GEOMETRY INFO
+    Sizegrip(root).place(rely=1.0, relx=1.0, x=0, y=0, anchor='se')
+    # root.resizable(0, 0) # no resize & removes maximize button
+    root.minsize(650, 375)  # width, height
+    # root.maxsize(680, 379)
+    # root.overrideredirect(True) # removed window decorations
+    # root.attributes('-type', 'splash')  # don't show in taskbar
+    # root.iconphoto(False, PhotoImage(file='icon.png'))
+    # root.attributes("-topmost", True)  # Keep on top of other windows
+
+    Application(root)
+
+    root.mainloop()
@@ -0,0 +1,1795 @@
+'''
+code file: sqlengine.py
+date: Oct 2026
+comments:
+    GUI free helpers used by sqlcells.py
+        reading input files (.xlsx, .xls, .csv)
+        on-disk cache of parsed input files
+        sqlite working database (Session) holding the dN tables
+        streaming csv ingest into an on-disk working database
+        streaming result writers (.xlsx, .xls, .csv, .db, .sqlite)
+        reading and writing saved query setup files
+        parsing several input files in parallel processes
+        query analysis: which tables and columns a query uses
+        indexing the join, filter and sort columns a query uses
+        cache of query results keyed by sql and input fingerprints
+        schema and statistics of an input file from a sample
+        compact (downcast, categorical) loaded frames
+        sqlite (.db, .sqlite) inputs attached read-only, no copying
+        workbook sheets as tables ("d2: book.xlsx[Sheet2]"), each workbook read once
+        PARAMS: one output per :name value, the inputs loaded once
+        preview: first rows of the inputs, result rows fetched in batches
+        scripts: temp tables computed once, the Nth SELECT feeds the Nth output
+        run trace: time, peak memory, rows and query plan per stage (sqlrun.jsonl)
+    A parsed input is stored as a binary sidecar file
+    (feather when pyarrow is installed, pickle otherwise)
+    keyed by path, mtime, size and optionally a content hash.
+'''
+import os
+import re
+import sys
+import csv
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import itertools
+import contextlib
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import sqlite3
+import pathlib
+import pandas as pd
+try:
+    import resource  # peak memory, not on Windows
+except ImportError:
+    resource = None
+try:
+    import psutil  # optional, peak memory on Windows
+except ImportError:
+    psutil = None
+
+try:
+    import pyarrow  # feather sidecars need pyarrow
+    import pyarrow.ipc
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+CACHE_DIR = ".sqlcells_cache"  # relative to the sqlcells.py directory
+CACHE_MAX_MB = 512             # sidecars are evicted (LRU) above this size
+CACHE_HASH = False             # also hash file contents (slower, but safer)
+INSPECT_ROWS = 1000            # rows sampled by the file inspector
+SHEET_ITEM = re.compile(r"(.+\.xlsx?)\[(.+)\]", re.IGNORECASE)  # "book.xlsx[Sheet2]"
+
+WORK_DB = "sqlcells_work.db"   # on-disk working database for streamed inputs
+STREAM_CSV_MB = 256            # csv inputs above this size are streamed
+CHUNK_ROWS = 50000             # rows per chunk when streaming a csv
+META_TABLE = "_sqlcells_tables"
+PROGRESS_STEPS = 100000        # sqlite instructions between progress calls
+LOAD_WORKERS = os.cpu_count() or 1  # processes parsing input files in parallel
+INDEX_MIN_ROWS = 10000         # smaller tables are not worth an index
+CATEGORY_RATIO = 0.5           # COMPACT: text columns with fewer distinct values are categorical
+
+SETUP_OPTIONS = ("LAUNCH", "LOG", "KEEP", "STREAM", "REFRESH", "COMPACT")  # in the order they are saved
+PARAM_WORKERS = 1              # PARAMS outputs written at the same time (on-disk working database)
+LOG_FILE = "sqllog.txt"
+RUN_LOG = "sqlrun.jsonl"       # per stage trace of logged runs, see sqlbatch.py --report
+
+OUTPUT_TYPES = (".xlsx", ".xls", ".csv", ".sqlite", ".db")
+RESULT_TABLE = "result_table"  # table name in .db/.sqlite outputs
+EXPORT_BATCH = 10000           # rows fetched from sqlite per write
+XLSX_MAX_ROWS = 1048576        # rows per sheet, the rest goes to the next sheet
+
+PREVIEW_INPUT_ROWS = 100000    # preview: rows read from the head of every input
+PREVIEW_ROWS = 1000000         # preview: result rows shown at most
+PREVIEW_FIRST = 200            # preview: rows in the first batch, shown right away
+
+RESULT_CACHE_DIR = os.path.join(CACHE_DIR, "results")
+RESULT_CACHE_ENTRIES = 50      # least recently used results are evicted above this
+RESULT_CACHE_TYPES = (".xlsx", ".xls", ".csv")  # .db outputs may hold other tables
+# results that depend on the clock, chance or the connection, never cached:
+# 'now', the date/time functions without a time value (date() is today),
+# strftime with only a format, current_date ..., random(), changes() ...
+VOLATILE_SQL = re.compile(r"""'now'
+    | \b(date|time|datetime|julianday|unixepoch)\s*\(\s*\)
+    | \bstrftime\s*\(\s*'(?:[^']|'')*'\s*\)
+    | \bcurrent_(date|time|timestamp)\b
+    | \b(random|randomblob|changes|total_changes|last_insert_rowid)\s*\(""",
+                          re.IGNORECASE | re.VERBOSE)
+
+
+def file_type(path):
+    ''' return the input type for path: "xls", "csv", "db" or "" '''
+    if path.endswith(("xlsx", "xls")):
+        return "xls"
+    if path.endswith("csv"):
+        return "csv"
+    if path.endswith((".db", ".sqlite")):
+        return "db"
+    return ""
+
+
+def read_setup(filepath):
+    ''' read a saved query setup file:
+        sqlcells
+        d1: /path/input.xlsx   (one line per input)
+        SQL
+        ... sql code ...       (statements separated by ;)
+        OUTPUT
+        /path/output.xlsx      (one line per SELECT statement)
+        LAUNCH, LOG ...        (options, one per line)
+        PARAMS                 (optional, one line per :name in the sql)
+        state: FL, GA, TX      (a value list, or a driving query:)
+        month: select distinct month from d1
+    returns a dict with inputs, sql, output (the outputs separated by "; "),
+    options and params {name: spec}
+    raises ValueError when filepath is not a setup file '''
+    code = ""
+    with open(filepath, "r", encoding="utf-8") as fin:
+        if fin.readline().strip() != "sqlcells":
+            raise ValueError(f"{filepath}: not a sqlcells setup file")
+        inputs = []
+        line = fin.readline()
+        while line.strip() != "SQL":
+            if line == "":
+                raise ValueError(f"{filepath}: SQL line missing")
+            if line.strip():
+                inputs.append(line.strip())
+            line = fin.readline()
+        while True:
+            line = fin.readline()  # now reading the SQL lines (with EOLs)
+            if line == "" or line.startswith("OUTPUT"):
+                break
+            code += line  # concatenate all the SQL lines
+        outputs = []
+        line = fin.readline().strip()  # read the output paths
+        while line and line not in SETUP_OPTIONS and line != "PARAMS":
+            outputs.append(line)
+            line = fin.readline().strip()
+        options = set()
+        params = {}
+        in_params = False
+        for line in itertools.chain([line], fin):
+            line = line.strip()
+            if line == "PARAMS":
+                in_params = True  # the lines that follow are parameters
+            elif in_params and ": " in line:
+                name, spec = line.split(": ", 1)
+                params[name.strip().lstrip(":")] = spec.strip()
+            elif line:
+                options.add(line)
+    return {"inputs": inputs, "sql": code.strip(), "output": "; ".join(outputs),
+            "options": options, "params": params}
+
+
+def write_setup(filepath, setup):
+    ''' write a setup dict (see read_setup) to filepath '''
+    with open(filepath, "w", encoding="utf-8") as fout:
+        fout.write("sqlcells\n")  # identifies saved query files
+        for line in setup["inputs"]:
+            fout.write(line + "\n")
+        fout.write("SQL\n")
+        fout.write(setup["sql"].rstrip("\n") + "\n")
+        fout.write("OUTPUT\n")
+        for output in split_outputs(setup["output"]) or [""]:
+            fout.write(output + "\n")
+        for option in SETUP_OPTIONS:
+            if option in setup["options"]:
+                fout.write(option + "\n")
+        if setup.get("params"):
+            fout.write("PARAMS\n")
+            for name, spec in setup["params"].items():
+                fout.write(f"{name}: {spec}\n")
+
+
+def rss_mb():
+    ''' resident memory of this process now in MB, None when unknown '''
+    try:
+        with open("/proc/self/statm", "r") as fin:
+            return round(int(fin.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    if psutil is not None:
+        return round(psutil.Process().memory_info().rss / 1048576, 1)
+    return None
+
+
+def reset_peak_rss():
+    ''' start a new peak_rss_mb window (Linux only)
+    returns False when peak_rss_mb stays the process lifetime peak '''
+    try:
+        with open("/proc/self/clear_refs", "w") as fout:
+            fout.write("5")  # resets the peak resident set size
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    ''' peak resident memory in MB since reset_peak_rss (Linux), else of
+    the process so far, None when unknown '''
+    try:
+        with open("/proc/self/status", "r") as fin:
+            for line in fin:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1048576 if sys.platform == "darwin" else 1024), 1)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 1048576, 1)
+    return None
+
+
+def query_plan(conn, sql, params=None):
+    ''' EXPLAIN QUERY PLAN of sql as indented lines '''
+    depth = {0: -1}
+    lines = []
+    for node, parent, unused, detail in conn.execute("EXPLAIN QUERY PLAN " + sql, params or ()):
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+class RunTrace:
+    ''' wall time, memory and row counts of the stages of one run
+    (parse, store, ingest, index, statement, query, export), appended to
+    RUN_LOG as one JSON line
+    every stage records the resident memory after it (rss_mb), the change
+    since the stage before (rss_delta_mb) and, where the peak can be reset
+    (Linux), the peak during the stage (peak_rss_mb) - elsewhere the run
+    only has the peak of the whole process so far (process_peak_rss_mb),
+    which includes earlier runs in the same process '''
+
+    def __init__(self, **info):
+        self.info = info
+        self.stages = []
+        self.start = time.perf_counter()
+        self.windowed = reset_peak_rss()
+        self.rss = rss_mb()
+        self.peak = self.rss or 0.0
+
+    def add(self, stage, seconds, **info):
+        ''' record a finished stage, info: table, rows, output, plan ... '''
+        record = {"stage": stage, "seconds": round(seconds, 4)}
+        record.update(self._memory())
+        record.update(info)
+        self.stages.append(record)  # list.append: safe from the export threads
+
+    def _memory(self):
+        # memory now, since the last stage and its peak (a new window per stage)
+        now = rss_mb()
+        memory = {"rss_mb": now}
+        if now is not None and self.rss is not None:
+            memory["rss_delta_mb"] = round(now - self.rss, 1)
+        self.rss = now
+        if self.windowed:
+            peak = peak_rss_mb()
+            reset_peak_rss()
+            memory["peak_rss_mb"] = peak
+            self.peak = max(self.peak, peak or 0.0, now or 0.0)
+        return memory
+
+    def peak_mb(self):
+        ''' peak memory of this run (of the process where it cannot be reset) '''
+        if not self.windowed:
+            return peak_rss_mb()
+        return max(self.peak, peak_rss_mb() or 0.0)
+
+    def write(self, path=RUN_LOG, **info):
+        ''' append the run, with info (outputs, cached ...), to path '''
+        record = {"time": datetime.now().isoformat(timespec="seconds")}
+        record.update(self.info)
+        record.update(info)
+        record["seconds"] = round(time.perf_counter() - self.start, 4)
+        record["rss_mb"] = rss_mb()
+        record["peak_rss_mb" if self.windowed else "process_peak_rss_mb"] = self.peak_mb()
+        record["stages"] = self.stages
+        with open(path, "a", encoding="utf-8") as fout:
+            fout.write(json.dumps(record, default=str) + "\n")
+
+
+def split_outputs(output):
+    ''' the output paths in an OUTPUT entry, separated by ; '''
+    return [path.strip() for path in output.split(";") if path.strip()]
+
+
+def split_statements(script):
+    ''' the sql statements in script, without their ; '''
+    statements = []
+    start = 0
+    for m in re.finditer(";", script):
+        part = script[start:m.end()]
+        if sqlite3.complete_statement(part):  # the ; is not in a string or remark
+            if part[:-1].strip():
+                statements.append(part[:-1].strip())
+            start = m.end()
+    if script[start:].strip():
+        statements.append(script[start:].strip())
+    return statements
+
+
+def returns_rows(statement):
+    ''' True for a SELECT (WITH, VALUES) statement, the ones that feed outputs '''
+    statement = re.sub(r"^(\s*--[^\n]*\n)*", "", statement)
+    return re.match(r"\s*(select|with|values)\b", statement, re.IGNORECASE) is not None
+
+
+def strip_remarks(query):
+    ''' the query without lines that start with # '''
+    lines = query.splitlines()
+    return "\n".join(line for line in lines if not line.lstrip().startswith("#"))
+
+
+def append_log(items, query, outfile, notes=(), logfile=LOG_FILE):
+    ''' append a run to the log file: time, inputs, sql, output and notes '''
+    with open(logfile, "a", encoding="utf-8") as fout:
+        fout.write(str(datetime.today()) + "\n\n")
+        for f in items:
+            fout.write(f + "\n")
+        fout.write("\n" + query.strip() + "\n\n" + outfile + "\n")
+        for note in notes:
+            fout.write(note + "\n")
+        fout.write("-------------------------------------\n")
+
+
+def parse_item(strg):
+    ''' split an input list entry "d1: /path/file.xlsx" or, for one
+    sheet of a workbook, "d2: /path/file.xlsx[Sheet2]"
+    into (name, path, file type, sheet name or None for the first sheet) '''
+    name, path = strg.split(": ", 1)
+    m = SHEET_ITEM.fullmatch(path)
+    if m:
+        path, sheet = m.groups()
+        return name, path, "xls", sheet
+    return name, path, file_type(path), None
+
+
+def sheet_key(sheet):
+    ''' fingerprint suffix for one sheet of a workbook, "" for the first '''
+    return "" if sheet is None else f"[{sheet}]"
+
+
+def sheet_names(path):
+    ''' names of the sheets in a workbook, without reading their cells '''
+    if path.endswith("xls"):
+        import xlrd
+        return xlrd.open_workbook(path, on_demand=True).sheet_names()
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+
+def read_input(path, ftype=None, **kwargs):
+    ''' parse an input file into a DataFrame
+    kwargs are passed on to the pandas reader '''
+    if ftype is None:
+        ftype = file_type(path)
+    if ftype == "csv":
+        return pd.read_csv(path, **kwargs)
+    return pd.read_excel(path, **kwargs)
+
+
+def driving_queries(params):
+    ''' the PARAMS specs that are queries, not value lists '''
+    return [spec for spec in params.values() if re.match(r"\s*(select|with)\b", spec, re.IGNORECASE)]
+
+
+def param_grid(conn, params):
+    ''' every combination of the PARAMS values as a list of {name: value}
+    a spec is a comma separated list (see _param_values) or a query on
+    conn, its first column '''
+    names, lists = [], []
+    for name, spec in params.items():
+        if spec in driving_queries({name: spec}):
+            values = [row[0] for row in conn.execute(spec)]
+        else:
+            values = _param_values(spec)
+        names.append(name)
+        lists.append(values)
+    return [dict(zip(names, combo)) for combo in itertools.product(*lists)]
+
+
+PARAM_VALUE = re.compile(r"""\s*("(?:[^"]|"")*"|'(?:[^']|'')*'|[^,]*?)\s*(,|$)""")
+
+
+def _param_values(spec):
+    ''' the values of a PARAMS list: unquoted numbers become numbers,
+    "quoted" or 'quoted' values stay text (zip codes, "01") and may
+    contain commas '''
+    values = []
+    for m in PARAM_VALUE.finditer(spec):
+        field = m.group(1)
+        if len(field) > 1 and field[0] in "\"'" and field[-1] == field[0]:
+            values.append(field[1:-1].replace(field[0] * 2, field[0]))
+        else:
+            values.append(_param_value(field))
+        if not m.group(2):
+            break  # the end of spec
+    return values
+
+
+def _param_value(text):
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def param_outfile(outfile, values):
+    ''' output path for one PARAMS combination: {name} fields in outfile
+    are filled in, otherwise the values are added to the file name '''
+    parts = {name: re.sub(r"[^\w.-]+", "_", str(v)).strip("_") or "_" for name, v in values.items()}
+    if "{" in outfile:
+        return outfile.format(**parts)
+    base, ext = os.path.splitext(outfile)
+    return "_".join([base] + list(parts.values())) + ext
+
+
+def normalize_sql(query):
+    ''' query without # remark lines and with runs of white space
+    outside of string literals collapsed, for the result cache key '''
+    parts = re.split(r"('(?:[^']|'')*')", strip_remarks(query))
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", parts[i])
+    return "".join(parts).strip()
+
+
+def referenced_tables(query, names):
+    ''' the table names (d1, d2 ...) that appear in query '''
+    text = _strip_strings(query)
+    return [n for n in names if re.search(rf"\b{re.escape(n)}\b", text, re.IGNORECASE)]
+
+
+def referenced_columns(query):
+    ''' lower case set of every identifier in query, a superset
+    of the column names used - None when a * selection needs
+    all columns, a NATURAL JOIN joins on columns it does not name
+    or an unquoted non-ASCII identifier (Größe) cannot be matched '''
+    text = re.sub(r"count\s*\(\s*\*\s*\)", "", _strip_strings(query), flags=re.IGNORECASE)
+    if re.search(r"\bselect\s+(distinct\s+|all\s+)?\*|,\s*\*|\.\*", text, re.IGNORECASE):
+        return None
+    if re.search(r"\bnatural\b", text, re.IGNORECASE) or not text.isascii():
+        return None
+    names = set(w.lower() for w in re.findall(r"[A-Za-z_][A-Za-z0-9_$]*", text))
+    # quoted identifiers may hold spaces: "Insured Value" [Insured Value] `Insured Value`
+    for quoted in re.findall(r'"([^"]*)"|\[([^\]]*)\]|`([^`]*)`', query):
+        names.update(q.lower() for q in quoted if q)
+    return names
+
+
+SQL_WORDS = set("""
+    select from where join inner left right full outer cross natural on using
+    group order by having limit offset union all except intersect as and or not
+    in is like glob between null case when then else end asc desc collate
+    distinct exists values with""".split())
+
+
+def index_candidates(query, tables):
+    ''' [(table or alias or None, column)] pairs that query uses in
+    equality joins, WHERE filters, GROUP BY and ORDER BY
+    and {alias: table} for the tables in the query '''
+    text = _strip_strings(query).replace("\n", " ")
+    ident = r"(?:([A-Za-z_]\w*)\.)?([A-Za-z_]\w*)"
+    aliases = {t.lower(): t for t in tables}
+    for t in tables:
+        for alias in re.findall(rf"\b{re.escape(t)}\s+(?:as\s+)?([A-Za-z_]\w*)", text, re.IGNORECASE):
+            if alias.lower() not in SQL_WORDS:
+                aliases[alias.lower()] = t
+    found = []
+    # a.x = b.y joins and x = ... comparisons
+    for q1, c1, q2, c2 in re.findall(rf"{ident}\s*==?\s*{ident}", text):
+        found += [(q1, c1), (q2, c2)]
+    # filter columns in WHERE
+    for where in re.findall(r"\bwhere\b(.*?)(?=\bgroup\b|\border\b|\blimit\b|\bunion\b|$)",
+                            text, re.IGNORECASE):
+        found += re.findall(rf"{ident}\s*(?:[<>=!]=?|<>|\bin\b|\blike\b|\bbetween\b|\bis\b)",
+                            where, re.IGNORECASE)
+    # GROUP BY and ORDER BY lists
+    for clause in re.findall(r"\b(?:group|order)\s+by\b(.*?)(?=\bhaving\b|\border\b|\blimit\b|\)|$)",
+                             text, re.IGNORECASE):
+        for item in clause.split(","):
+            m = re.match(rf"\s*{ident}\s*(?:asc\b|desc\b|collate\b|$)", item, re.IGNORECASE)
+            if m:
+                found.append(m.groups())
+    result = []
+    for q, c in found:
+        pair = (q or None, c)
+        if c.lower() not in SQL_WORDS and pair not in result:
+            result.append(pair)
+    return result, aliases
+
+
+def join_columns(query):
+    ''' [((table or alias or None, column), (table or alias or None, column))]
+    of the a.x = b.y equality joins in query, both sides may be columns
+    of the same table (see Session.create_indexes) '''
+    text = _strip_strings(query).replace("\n", " ")
+    ident = r"(?:([A-Za-z_]\w*)\.)?([A-Za-z_]\w*)"
+    joins = []
+    for q1, c1, q2, c2 in re.findall(rf"{ident}\s*==?\s*{ident}", text):
+        if c1.lower() not in SQL_WORDS and c2.lower() not in SQL_WORDS:
+            joins.append(((q1 or None, c1), (q2 or None, c2)))
+    return joins
+
+
+# "SEARCH d2 USING AUTOMATIC COVERING INDEX (Policy=?)", before sqlite 3.36
+# "SEARCH TABLE d2 AS b USING AUTOMATIC PARTIAL COVERING INDEX (Policy=?)"
+AUTOMATIC_INDEX = re.compile(r"\b(?:SEARCH|SCAN)\s+(?:TABLE\s+)?(\w+)(?:\s+AS\s+(\w+))?"
+                             r"\s+USING\s+AUTOMATIC\b[^(]*\(([^)]*)\)")
+
+
+def _strip_strings(query):
+    ''' query without 'string literals' and quoted identifiers '''
+    return re.sub(r"'(?:[^']|'')*'|\"[^\"]*\"|\[[^\]]*\]|`[^`]*`", " ", query)
+
+
+def inspect_file(path, ftype=None, sample_rows=INSPECT_ROWS, sheet=None):
+    ''' schema and statistics of an input file (or sheet) from its first
+    sample_rows rows, the file is never parsed as a whole
+    returns a dict: rows (estimated when "estimate" is True),
+    sample (rows read) and columns [[name, dtype, null %, distinct]] '''
+    if ftype is None:
+        ftype = file_type(path)
+    if ftype == "db":
+        return inspect_db(path)
+    rows, estimate = None, False
+    if ftype == "csv":
+        df = pd.read_csv(path, nrows=sample_rows)
+        if len(df) < sample_rows:
+            rows = len(df)
+        else:
+            # file size / average size of the sampled lines
+            with open(path, "rb") as fin:
+                header = len(fin.readline())
+                sampled = sum(len(fin.readline()) for _ in range(len(df)))
+            rows = int((os.path.getsize(path) - header) / max(sampled / len(df), 1))
+            estimate = True
+    else:
+        df = pd.read_excel(path, sheet_name=0 if sheet is None else sheet, nrows=sample_rows)
+        if len(df) < sample_rows:
+            rows = len(df)
+        else:
+            rows = _sheet_rows(path, sheet)
+    columns = []
+    for name in df.columns:
+        col = df[name]
+        nulls = round(100 * col.isna().mean(), 1) if len(df) else 0.0
+        columns.append([str(name), str(col.dtype), nulls, int(col.nunique())])
+    return {"rows": rows, "estimate": estimate, "sample": len(df), "columns": columns}
+
+
+def inspect_db(path):
+    ''' tables, row counts and columns of a sqlite input
+    returns a dict: tables [[name, rows]] and columns [[table.column, type]] '''
+    conn = sqlite3.connect(db_uri(path), uri=True)
+    try:
+        tables, columns = [], []
+        names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                            "AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        for t in names:
+            rows = conn.execute(f'SELECT count(*) FROM "{t}"').fetchone()[0]
+            tables.append([t, rows])
+            for row in conn.execute(f'PRAGMA table_info("{t}")'):
+                columns.append([f"{t}.{row[1]}", row[2]])
+    finally:
+        conn.close()
+    return {"tables": tables, "columns": columns}
+
+
+def db_uri(path):
+    ''' read-only sqlite URI for path '''
+    return pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+
+
+def _sheet_rows(path, sheet=None):
+    ''' data rows in a sheet (the first one for None), from the workbook dimensions '''
+    try:
+        if path.endswith("xls"):
+            import xlrd
+            book = xlrd.open_workbook(path, on_demand=True)
+            if sheet is None:
+                return book.sheet_by_index(0).nrows - 1
+            return book.sheet_by_name(sheet).nrows - 1
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True)
+        try:
+            ws = wb.worksheets[0] if sheet is None else wb[sheet]
+            max_row = ws.max_row
+        finally:
+            wb.close()
+        return None if max_row is None else max_row - 1
+    except Exception:
+        return None  # unknown
+
+
+def inspect_text(path, info):
+    ''' the inspector result as text for the info window '''
+    if "tables" in info:
+        tables = pd.DataFrame(info["tables"], columns=["table", "rows"])
+        columns = pd.DataFrame(info["columns"], columns=["column", "type"])
+        return (f"{os.path.basename(path)}\n\n" + tables.to_string(index=False)
+                + "\n\n" + columns.to_string(index=False))
+    if info["rows"] is None:
+        rows = "rows: unknown"
+    else:
+        rows = f"rows: {'about ' if info['estimate'] else ''}{info['rows']:,}"
+    table = pd.DataFrame(info["columns"], columns=["column", "dtype", "null %", "distinct"])
+    return (f"{os.path.basename(path)}\n{rows}  (statistics from {info['sample']:,} sampled rows)\n\n"
+            + table.to_string(index=False))
+
+
+def content_hash(path, blocksize=1 << 20):
+    ''' hash of the file contents '''
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fin:
+        block = fin.read(blocksize)
+        while block:
+            h.update(block)
+            block = fin.read(blocksize)
+    return h.hexdigest()
+
+
+def file_fingerprint(path, extra="", use_hash=False):
+    ''' key that changes whenever the file at path changes '''
+    st = os.stat(path)
+    parts = [os.path.realpath(path), str(st.st_mtime_ns), str(st.st_size), extra]
+    if use_hash:
+        parts.append(content_hash(path))
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class FrameCache:
+    ''' LRU cache of parsed input files kept in cache_dir '''
+
+    def __init__(self, cache_dir=CACHE_DIR, max_mb=CACHE_MAX_MB, use_hash=CACHE_HASH):
+        self.cache_dir = cache_dir
+        self.max_mb = max_mb
+        self.max_bytes = max_mb * 1024 * 1024
+        self.use_hash = use_hash
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def fingerprint(self, path, extra=""):
+        ''' cache key for path: path + mtime + size (+ content hash) '''
+        return file_fingerprint(path, extra, self.use_hash)
+
+    def load(self, path, ftype=None, columns=None, **kwargs):
+        ''' return the parsed input file, from the cache when possible
+        columns is a set of lower case names to keep (None for all) '''
+        key, df = self._lookup(path, columns, kwargs)
+        if df is not None:
+            self.hits += 1
+            return df
+        self.misses += 1
+        if columns is not None:
+            df = read_input(path, ftype, usecols=lambda c: str(c).lower() in columns, **kwargs)
+            if len(df.columns) == 0:
+                # no header matched the query, so fall back to every column
+                self.misses -= 1  # counted again by the load below
+                return self.load(path, ftype, None, **kwargs)
+        else:
+            df = read_input(path, ftype, **kwargs)
+        self._write(key, df)
+        self.evict()
+        return df
+
+    def load_sheets(self, path, sheets, columns=None):
+        ''' return the parsed sheets of a workbook (None is the first
+        sheet) as a list of DataFrames in the order of sheets
+        the sheets not in the cache are read together, opening the workbook once '''
+        frames = {}
+        todo = []
+        for sheet in dict.fromkeys(sheets):
+            key, df = self._lookup(path, columns, _sheet_args(sheet))
+            if df is None:
+                todo.append((sheet, key))
+            else:
+                self.hits += 1
+                frames[sheet] = df
+        if todo:
+            self.misses += len(todo)
+            usecols = None if columns is None else (lambda c: str(c).lower() in columns)
+            parsed = pd.read_excel(path, sheet_name=[0 if s is None else s for s, key in todo],
+                                   usecols=usecols)
+            for sheet, key in todo:
+                df = parsed[0 if sheet is None else sheet]
+                if len(df.columns) == 0 and columns is not None:
+                    # no header matched the query, so fall back to every column
+                    self.misses -= 1
+                    df = self.load(path, "xls", None, **_sheet_args(sheet))
+                else:
+                    self._write(key, df)
+                frames[sheet] = df
+            self.evict()
+        return [frames[sheet] for sheet in sheets]
+
+    def is_cached(self, path, columns=None, sheet=None):
+        ''' True when load (or load_sheets) would read path from a sidecar,
+        only checks that the sidecar exists '''
+        extra = repr(sorted(_sheet_args(sheet).items()))
+        keys = [self.fingerprint(path, extra)]
+        if columns is not None:
+            keys.append(self.fingerprint(path, extra + repr(sorted(columns))))
+        return any(os.path.isfile(sidecar) for key in keys for sidecar in self._sidecars(key))
+
+    def _lookup(self, path, columns, kwargs):
+        ''' (sidecar key, cached DataFrame or None) for path parsed with kwargs '''
+        extra = repr(sorted(kwargs.items()))
+        full_key = self.fingerprint(path, extra)
+        if columns is None:
+            key = full_key
+        else:
+            key = self.fingerprint(path, extra + repr(sorted(columns)))
+        df = self._read(key)
+        if df is None and columns is not None:
+            # a cached full parse can serve any column subset
+            df = self._read(full_key)
+            if df is not None:
+                subset = [c for c in df.columns if str(c).lower() in columns]
+                if subset:
+                    df = df[subset]
+        return key, df
+
+    def inspect(self, path, ftype=None, sheet=None):
+        ''' inspect_file(path) kept per file fingerprint '''
+        info_file = os.path.join(self.cache_dir,
+                                 self.fingerprint(path, "inspect" + sheet_key(sheet)) + ".json")
+        try:
+            with open(info_file, "r", encoding="utf-8") as fin:
+                info = json.load(fin)
+            os.utime(info_file)  # mark as recently used
+            return info
+        except (OSError, ValueError):
+            pass
+        info = inspect_file(path, ftype, sheet=sheet)
+        tmp = f"{info_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fout:
+                json.dump(info, fout)
+            os.replace(tmp, info_file)
+        except OSError:
+            _remove(tmp)  # caching is best effort
+        return info
+
+    def _sidecars(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".feather", base + ".pkl"
+
+    def _read(self, key):
+        ''' return the cached DataFrame for key or None '''
+        for sidecar in self._sidecars(key):
+            if not os.path.isfile(sidecar):
+                continue
+            try:
+                if sidecar.endswith(".feather"):
+                    df = pd.read_feather(sidecar)
+                else:
+                    df = pd.read_pickle(sidecar)
+            except Exception:
+                _remove(sidecar)  # damaged sidecar, parse the file again
+                return None
+            try:
+                os.utime(sidecar)  # mark as recently used
+            except OSError:
+                pass  # evicted by another process meanwhile
+            return df
+        return None
+
+    def _write(self, key, df):
+        ''' store df as a sidecar, feather first then pickle
+        written under a temporary name, so other processes
+        never read a half written sidecar '''
+        feather, pkl = self._sidecars(key)
+        tmp = os.path.join(self.cache_dir, f"{key}.{os.getpid()}.tmp")
+        if HAVE_ARROW:
+            try:
+                df.to_feather(tmp)
+                os.replace(tmp, feather)
+                return
+            except Exception:
+                # e.g. mixed types in a column or non string headers
+                _remove(tmp)
+        try:
+            df.to_pickle(tmp)
+            os.replace(tmp, pkl)
+        except Exception:
+            _remove(tmp)  # caching is best effort
+
+    def evict(self):
+        ''' remove least recently used sidecars above max_bytes '''
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isfile(path) and not name.endswith(".tmp"):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(e[1] for e in entries)
+        entries.sort()  # oldest first
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def counters(self):
+        ''' hit/miss line for the log '''
+        return f"cache: {self.hits} hits, {self.misses} misses"
+
+
+class ResultCache:
+    ''' copies of output files keyed by the normalized sql and the
+    fingerprints of the input files it reads, so an unchanged setup
+    is not executed again '''
+
+    def __init__(self, cache_dir=RESULT_CACHE_DIR, max_entries=RESULT_CACHE_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, query, items, outfile, params=None, index=0):
+        ''' result key for output number index of query (with the :name
+        values params) on the input list entries, or None when outfile is
+        not a cacheable type, the query uses the date/time now or random()
+        (see VOLATILE_SQL) or an input file is missing '''
+        ext = os.path.splitext(outfile)[1].lower()
+        if ext not in RESULT_CACHE_TYPES:
+            return None
+        sql = normalize_sql(query)
+        if VOLATILE_SQL.search(sql):
+            return None
+        inputs = [parse_item(f) for f in items]
+        used = referenced_tables(query, [name for name, path, ftype, sheet in inputs])
+        parts = [sql, ext]
+        if params:
+            parts.append(repr(sorted(params.items())))
+        if index:
+            parts.append(f"output {index}")
+        try:
+            for name, path, ftype, sheet in inputs:
+                if name in used:
+                    parts.append(f"{name}={file_fingerprint(path, sheet_key(sheet))}")
+        except OSError:
+            return None
+        return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def fetch(self, key, outfile):
+        ''' put the cached result for key in outfile
+        returns the number of rows, or None on a miss '''
+        if key is None:
+            return None
+        meta = os.path.join(self.cache_dir, key + ".json")
+        if not os.path.isfile(meta):
+            return None
+        try:
+            with open(meta, "r", encoding="utf-8") as fin:
+                info = json.load(fin)
+            saved = os.path.join(self.cache_dir, key + info["ext"])
+            # reuse outfile when it still is the cached result, else copy
+            if not _same_file(outfile, saved):
+                shutil.copyfile(saved, outfile)
+            os.utime(meta)  # mark as recently used
+        except (OSError, ValueError, KeyError):
+            return None
+        return info["rows"]
+
+    def has(self, key):
+        ''' True when a result for key is cached, outfile is not touched '''
+        if key is None:
+            return False
+        try:
+            with open(os.path.join(self.cache_dir, key + ".json"), "r", encoding="utf-8") as fin:
+                info = json.load(fin)
+            return os.path.isfile(os.path.join(self.cache_dir, key + info["ext"]))
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def store(self, key, outfile, rows):
+        ''' keep a copy of outfile as the result for key '''
+        if key is None:
+            return
+        ext = os.path.splitext(outfile)[1].lower()
+        saved = os.path.join(self.cache_dir, key + ext)
+        tmp = saved + f".{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(outfile, tmp)
+            os.replace(tmp, saved)
+            with open(tmp, "w", encoding="utf-8") as fout:
+                json.dump({"rows": rows, "ext": ext, "output": outfile}, fout)
+            os.replace(tmp, os.path.join(self.cache_dir, key + ".json"))
+        except OSError:
+            _remove(tmp)  # caching is best effort
+            return
+        self.evict()
+
+    def evict(self):
+        ''' remove least recently used results above max_entries '''
+        metas = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    metas.append((os.stat(path).st_mtime, name[:-5]))
+                except OSError:
+                    continue
+        metas.sort(reverse=True)  # newest first
+        for mtime, key in metas[self.max_entries:]:
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(key + "."):
+                    _remove(os.path.join(self.cache_dir, name))
+
+
+def _same_file(path1, path2):
+    ''' True when both files exist and have the same contents '''
+    try:
+        if os.path.getsize(path1) != os.path.getsize(path2):
+            return False
+    except OSError:
+        return False
+    return content_hash(path1) == content_hash(path2)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Session:
+    ''' sqlite working database holding the dN tables
+    a table is only (re)loaded when its source file changed
+    the source fingerprints are kept in the database itself,
+    so an on-disk working database stays loaded between runs '''
+
+    def __init__(self, dbpath=":memory:"):
+        self.dbpath = dbpath
+        # queries run on a worker thread, Cancel interrupts from the Tk thread
+        self.conn = sqlite3.connect(dbpath, check_same_thread=False, uri=True)
+        if dbpath != ":memory:":
+            # scratch database: trade durability for load speed
+            self.conn.execute("PRAGMA synchronous = OFF")
+            self.conn.execute("PRAGMA journal_mode = MEMORY")
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} "
+                          "(name TEXT PRIMARY KEY, key TEXT, columns TEXT)")
+        self.conn.commit()
+        self.attached = {}  # name -> path of an attached .db/.sqlite input
+        self.loaded = {}  # table name -> (fingerprint of its source file, columns)
+        for name, key, columns in self.conn.execute(f"SELECT * FROM {META_TABLE}"):
+            self.loaded[name] = (key, None if columns is None else set(json.loads(columns)))
+
+    def is_current(self, name, key, columns=None):
+        ''' True when table name holds columns of the file with fingerprint key '''
+        if name not in self.loaded:
+            return False
+        loaded_key, loaded_cols = self.loaded[name]
+        return loaded_key == key and (loaded_cols is None or
+                                      (columns is not None and columns <= loaded_cols))
+
+    def load(self, name, path, ftype, cache, columns=None, stream=False, progress=None, key=None):
+        ''' materialize input file path as table name, only the
+        columns in the set columns when it is not None
+        stream=True ingests a csv in chunks without a DataFrame of the whole file
+        key is recorded as the table's fingerprint (default: the file's,
+        load_tables adds the sheet and COMPACT to it)
+        returns the number of rows loaded, None when the table was current '''
+        if key is None:
+            key = cache.fingerprint(path)
+        if self.is_current(name, key, columns):
+            return None
+        if stream and ftype == "csv":
+            self._forget(name)  # stale until the load below completes
+            rows = self.ingest_csv(name, path, columns, progress=progress)
+            self._record(name, key, columns)
+            return rows
+        df = cache.load(path, ftype, columns)
+        self.store(name, key, df, columns)
+        return len(df)
+
+    def store(self, name, key, df, columns=None):
+        ''' materialize df, parsed from the file with fingerprint key,
+        as table name '''
+        self._forget(name)  # stale until the load below completes
+        df.to_sql(name, self.conn, if_exists="replace", index=False)
+        self._record(name, key, columns)
+
+    def ingest_csv(self, name, path, columns=None, chunksize=CHUNK_ROWS, progress=None):
+        ''' read a csv in chunks of chunksize rows straight into table name
+        progress(name, rows) is called after every chunk
+        returns the number of rows ingested '''
+        usecols = None if columns is None else (lambda c: str(c).lower() in columns)
+        reader = pd.read_csv(path, chunksize=chunksize, usecols=usecols)
+        rows = 0
+        insert = None
+        with self.conn:  # a single transaction for the whole file
+            self.conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            for chunk in reader:
+                if insert is None:
+                    self.conn.execute(_create_table_sql(name, chunk))
+                    marks = ", ".join("?" * len(chunk.columns))
+                    insert = f'INSERT INTO "{name}" VALUES ({marks})'
+                self.conn.executemany(insert, chunk.itertuples(index=False, name=None))
+                rows += len(chunk)
+                if progress is not None:
+                    progress(name, rows)
+        if insert is None and columns is not None:
+            # no header matched the query, so fall back to every column
+            return self.ingest_csv(name, path, None, chunksize, progress)
+        return rows
+
+    def _record(self, name, key, columns):
+        cols = None if columns is None else json.dumps(sorted(columns))
+        self.conn.execute(f"INSERT OR REPLACE INTO {META_TABLE} VALUES (?, ?, ?)",
+                          (name, key, cols))
+        self.conn.commit()
+        self.loaded[name] = (key, columns)
+
+    def _forget(self, name):
+        self.conn.execute(f"DELETE FROM {META_TABLE} WHERE name = ?", (name,))
+        self.conn.commit()
+        self.loaded.pop(name, None)
+
+    def attach(self, name, path):
+        ''' mount the sqlite file path read-only as schema name, its
+        tables are queried in place as name.table - when it holds a
+        single table that table is also the view name
+        returns True when the file was (re)attached '''
+        if self.attached.get(name) == path:
+            return False
+        self.detach(name)
+        if name in self.loaded:
+            self.conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            self._forget(name)
+        _attach(self.conn, name, path)
+        self.attached[name] = path
+        return True
+
+    def detach(self, name):
+        if name in self.attached:
+            self.conn.execute(f'DROP VIEW IF EXISTS temp."{name}"')
+            self.conn.execute(f'DETACH DATABASE "{name}"')
+            del self.attached[name]
+
+    def keep_only(self, names):
+        ''' drop tables that are no longer inputs '''
+        for name in list(self.loaded):
+            if name not in names:
+                self.conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+                self._forget(name)
+        for name in list(self.attached):
+            if name not in names:
+                self.detach(name)
+
+    def create_indexes(self, query, min_rows=INDEX_MIN_ROWS, trace=None, kept=False):
+        ''' index the columns of the loaded tables that query joins,
+        filters, groups or sorts on - on an on-disk working database
+        the indexes stay until the table is reloaded
+        kept=True: the indexes are used again (a kept session or a query
+        run once per PARAMS value), else on an in-memory database only
+        the equality joins sqlite does not already build an automatic
+        index for are indexed, building the rest costs more than it saves
+        returns the names of the indexes created '''
+        tables = [t for t in self.loaded if re.search(rf"\b{re.escape(t)}\b", query, re.IGNORECASE)]
+        if not tables:
+            return []
+        columns = {}  # table -> {lower case column name: column name}
+        for t in tables:
+            columns[t] = {row[1].lower(): row[1]
+                          for row in self.conn.execute(f'PRAGMA table_info("{t}")')}
+        candidates, aliases = index_candidates(query, tables)
+
+        def owner(q, c):
+            if q is not None:
+                owners = [aliases[q.lower()]] if q.lower() in aliases else []
+            else:
+                owners = [t for t in tables if c.lower() in columns[t]]
+            if len(owners) == 1 and c.lower() in columns[owners[0]]:
+                return owners[0], columns[owners[0]][c.lower()]
+            return None
+
+        if kept or self.dbpath != ":memory:":
+            found = [owner(q, c) for q, c in candidates]
+        else:
+            automatic = self._automatic_indexes(query, aliases)
+            found = []
+            for left, right in join_columns(query):
+                pair = [owner(*left), owner(*right)]
+                if None in pair or (pair[0][0] == pair[1][0] and
+                                    (left[0] or "").lower() == (right[0] or "").lower()):
+                    continue  # not a join of two loaded tables (or a self join)
+                if not any((t, c.lower()) in automatic for t, c in pair):
+                    found += pair
+        wanted = []
+        for pair in found:
+            if pair is not None and pair not in wanted:
+                wanted.append(pair)
+        created = []
+        for t, c in wanted:
+            rows = self.conn.execute(f'SELECT max(rowid) FROM "{t}"').fetchone()[0] or 0
+            if rows < min_rows:
+                continue
+            name = "ix_" + re.sub(r"\W", "_", f"{t}_{c}")
+            exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' "
+                                       "AND name = ?", (name,)).fetchone()
+            if not exists:
+                start = time.perf_counter()
+                self.conn.execute(f'CREATE INDEX "{name}" ON "{t}" ("{c}")')
+                created.append(name)
+                if trace is not None:
+                    trace.add("index", time.perf_counter() - start, table=t, index=name, rows=rows)
+        self.conn.commit()
+        return created
+
+    def _automatic_indexes(self, query, aliases):
+        # {(table, lower case column)} that the query plan builds an
+        # automatic index on, statements that cannot be planned yet (they
+        # read a temp table of the script or have :name parameters) are left out
+        found = set()
+        for statement in split_statements(query):
+            try:
+                plan = query_plan(self.conn, statement)
+            except sqlite3.Error:
+                continue
+            for line in plan:
+                for table, alias, terms in AUTOMATIC_INDEX.findall(line):
+                    table = aliases.get((alias or table).lower(), table)
+                    found.update((table, c.lower()) for c in re.findall(r"(\w+)\s*[=<>]", terms))
+        return found
+
+    def watch(self, callback, steps=PROGRESS_STEPS):
+        ''' call callback() every steps sqlite instructions while a
+        statement runs, callback returning True aborts the statement
+        callback=None removes the handler '''
+        self.conn.set_progress_handler(callback, steps)
+
+    def interrupt(self):
+        ''' abort the running statement (safe from any thread) '''
+        self.conn.interrupt()
+
+    def query(self, sql):
+        ''' run sql and return the result as a DataFrame '''
+        return pd.read_sql_query(sql, self.conn)
+
+    def export(self, sql, outfile, batch=EXPORT_BATCH, params=None):
+        ''' run sql (with the :name values params) and stream the result
+        rows into outfile
+        returns (rows, seconds) '''
+        return export_query(self.conn, sql, outfile, batch, params)
+
+    def run_script(self, script, outfiles, batch=EXPORT_BATCH, params=None, trace=None):
+        ''' run the statements of script, see run_script below
+        returns [(rows, seconds)] for every output '''
+        return run_script(self.conn, script, outfiles, batch, params, trace)
+
+    def run_scripts(self, script, jobs, workers=PARAM_WORKERS, batch=EXPORT_BATCH, trace=None):
+        ''' run script once for every (params, outfiles) in jobs
+        an on-disk working database is read by up to workers
+        connections at the same time, otherwise one after another
+        returns [[(rows, seconds)]] in the order of jobs '''
+        if workers <= 1 or len(jobs) < 2 or self.dbpath == ":memory:":
+            return [self.run_script(script, outfiles, batch, params, trace)
+                    for params, outfiles in jobs]
+        self.conn.commit()  # the readers see the tables and indexes as they are now
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            return list(pool.map(lambda job: self._script_reader(script, *job, batch, trace), jobs))
+
+    def _script_reader(self, script, params, outfiles, batch, trace):
+        conn = sqlite3.connect(self.dbpath, uri=True)
+        try:
+            for name, path in self.attached.items():
+                _attach(conn, name, path)
+            return run_script(conn, script, outfiles, batch, params, trace)
+        finally:
+            conn.close()
+
+    def close(self):
+        self.conn.close()
+        self.loaded = {}
+
+
+def _attach(conn, name, path):
+    conn.execute(f'ATTACH DATABASE ? AS "{name}"', (db_uri(path),))
+    tables = [r[0] for r in conn.execute(
+        f"""SELECT name FROM "{name}".sqlite_master WHERE type IN ('table', 'view')
+        AND name NOT LIKE 'sqlite_%'""")]
+    if len(tables) == 1:
+        conn.execute(f'CREATE TEMP VIEW "{name}" AS SELECT * FROM "{name}"."{tables[0]}"')
+
+
+def run_script(conn, script, outfiles, batch=EXPORT_BATCH, params=None, trace=None):
+    ''' run the statements of script on conn in order: the Nth statement
+    that returns rows is exported to outfiles[N], the others (CREATE TEMP
+    TABLE ...) are executed - temp tables of an earlier run are dropped first
+    trace (a RunTrace) records every statement with its query plan
+    the input tables are read-only (see _read_only_inputs)
+    returns [(rows, seconds)] for every output '''
+    statements = split_statements(script)
+    selects = sum(1 for s in statements if returns_rows(s))
+    if selects != len(outfiles):
+        raise ValueError(f"{len(outfiles)} output file(s) for {selects} SELECT statement(s)")
+    _drop_temp_tables(conn)
+    with _read_only_inputs(conn):
+        exported = _run_statements(conn, statements, outfiles, batch, params, trace)
+    conn.commit()
+    return exported
+
+
+def _run_statements(conn, statements, outfiles, batch, params, trace):
+    exported = []
+    for statement in statements:
+        if trace is None:
+            if returns_rows(statement):
+                exported.append(export_query(conn, statement, outfiles[len(exported)], batch, params))
+            else:
+                conn.execute(statement, params or ())
+            continue
+        plan = query_plan(conn, statement, params)
+        if returns_rows(statement):
+            outfile = outfiles[len(exported)]
+            stats = {}
+            rows, seconds = export_query(conn, statement, outfile, batch, params, stats)
+            exported.append((rows, seconds))
+            trace.add("query", stats["query"], output=outfile, rows=rows, params=params, plan=plan)
+            trace.add("export", seconds - stats["query"], output=outfile, rows=rows)
+        else:
+            start = time.perf_counter()
+            cur = conn.execute(statement, params or ())
+            trace.add("statement", time.perf_counter() - start, sql=statement[:200],
+                      rows=cur.rowcount if cur.rowcount >= 0 else None, params=params, plan=plan)
+    return exported
+
+
+# statements a script may not run on the main schema (the input tables)
+WRITE_ACTIONS = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE,
+                 sqlite3.SQLITE_DROP_TABLE, sqlite3.SQLITE_CREATE_TABLE,
+                 sqlite3.SQLITE_DROP_VIEW, sqlite3.SQLITE_CREATE_VIEW)
+
+
+@contextlib.contextmanager
+def _read_only_inputs(conn):
+    # the tables in main are the loaded inputs, still marked current in
+    # META_TABLE: a script changing them would change every later run of an
+    # on-disk or kept session, so it may only create and change temp tables
+    def authorize(action, arg1, arg2, db, trigger):
+        if action in WRITE_ACTIONS and db == "main" and not arg1.startswith("sqlite_"):
+            return sqlite3.SQLITE_DENY
+        if action == sqlite3.SQLITE_ALTER_TABLE and arg1 == "main":
+            return sqlite3.SQLITE_DENY
+        return sqlite3.SQLITE_OK
+    conn.set_authorizer(authorize)
+    try:
+        yield
+    except sqlite3.DatabaseError as e:
+        if str(e) != "not authorized":
+            raise
+        raise ValueError("The input tables are read-only: use CREATE TEMP TABLE "
+                         "for intermediate results.") from None
+    finally:
+        conn.set_authorizer(None)
+
+
+def _drop_temp_tables(conn):
+    # intermediates of an earlier script run (the temp views of attached inputs stay)
+    for (name,) in conn.execute("SELECT name FROM sqlite_temp_master WHERE type = 'table'").fetchall():
+        conn.execute(f'DROP TABLE temp."{name}"')
+
+
+def export_outputs(session, query, output, items, params=None, results=None, refresh=False,
+                   workers=PARAM_WORKERS, trace=None):
+    ''' run the script query into the outputs (separated by ; in output),
+    with PARAMS once for every combination of their values (see param_grid)
+    into outputs of their own (see param_outfile)
+    outputs still in the result cache are reused unless refresh=True
+    returns [(outfile, rows, seconds, cached)] '''
+    outfiles = split_outputs(output)
+    runs, jobs = [], []
+    for values in param_grid(session.conn, params) if params else [None]:
+        outs = [param_outfile(out, values) for out in outfiles] if values else outfiles
+        keys = [None if results is None else results.key(query, items, out, values, i)
+                for i, out in enumerate(outs)]
+        rows = [None if refresh or results is None else results.fetch(key, out)
+                for key, out in zip(keys, outs)]
+        if None in rows:
+            jobs.append((values, outs, keys, len(runs)))
+        runs.append([(out, n, 0.0, True) for out, n in zip(outs, rows)])
+    exported = session.run_scripts(query, [(values, outs) for values, outs, keys, i in jobs],
+                                   workers, trace=trace)
+    for (values, outs, keys, i), counts in zip(jobs, exported):
+        runs[i] = []
+        for key, out, (n, seconds) in zip(keys, outs, counts):
+            if results is not None:
+                results.store(key, out, n)
+            runs[i].append((out, n, seconds, False))
+    return [out for run in runs for out in run]
+
+
+def cached_outputs(results, query, items, output):
+    ''' [(outfile, rows, 0.0, True)] when every output of query could be
+    put in place from the result cache, else None '''
+    outputs = []
+    for i, out in enumerate(split_outputs(output)):
+        rows = results.fetch(results.key(query, items, out, index=i), out)
+        if rows is None:
+            return None
+        outputs.append((out, rows, 0.0, True))
+    return outputs
+
+
+def has_cached_outputs(results, query, items, output):
+    ''' True when cached_outputs would find every output of query '''
+    return all(results.has(results.key(query, items, out, index=i))
+               for i, out in enumerate(split_outputs(output)))
+
+
+def run_pipeline(session, items, query, output, cache, results=None, params=None, refresh=False,
+                 stream=False, compact=False, load_workers=LOAD_WORKERS,
+                 param_workers=PARAM_WORKERS, ingested=None, watch=None, cancelled=None,
+                 trace=None, kept=False):
+    ''' run query (remarks stripped) on the input list items into output,
+    the steps shared by the GUI, sqlbatch.py and the benchmark:
+    result cache -> load_tables (also what the PARAMS driving queries read)
+    -> create_indexes -> export_outputs
+    results (a ResultCache) reuses unchanged outputs unless refresh=True
+    or there are params; ingested(name, rows) reports streamed csv
+    progress, watch is the sqlite progress handler of the indexing and
+    the export; cancelled() returning True stops after the load
+    kept=True when session stays loaded after the run (see create_indexes)
+    returns a dict: outputs [(outfile, rows, seconds, cached)], rows,
+    seconds (of the export), cached (every output from the result
+    cache), timings, indexes and memory - see run_notes '''
+    run = {"outputs": [], "rows": 0, "seconds": 0.0, "cached": False,
+           "timings": {}, "indexes": [], "memory": {}}
+    if results is not None and not (refresh or params):
+        outputs = cached_outputs(results, query, items, output)
+        if outputs is not None:
+            run.update(outputs=outputs, cached=True, rows=sum(n for out, n, s, hit in outputs))
+            return run
+    used = "\n".join([query] + driving_queries(params or {}))
+    run["timings"] = load_tables(session, items, cache, used, stream, ingested,
+                                 workers=load_workers, compact=compact,
+                                 memory=run["memory"], trace=trace)
+    if cancelled is not None and cancelled():
+        raise InterruptedError("cancelled")
+    session.watch(watch)
+    try:
+        run["indexes"] = session.create_indexes(query, trace=trace, kept=kept or bool(params))
+        run["outputs"] = export_outputs(session, query, output, items, params, results,
+                                        refresh, param_workers, trace)
+    finally:
+        session.watch(None)
+    run["rows"] = sum(n for out, n, s, hit in run["outputs"])
+    run["seconds"] = sum(s for out, n, s, hit in run["outputs"])
+    return run
+
+
+def run_notes(run, cache):
+    ''' log lines of a run_pipeline run '''
+    outputs = run["outputs"]
+    notes = [f"{out}: {n:,} rows" + (" (cached)" if hit else "")
+             for out, n, s, hit in outputs if len(outputs) > 1]
+    if run["cached"]:
+        return notes + ["result cache: hit", f"{run['rows']:,} rows reused"]
+    return notes + ["result cache: miss", cache.counters(), "load: " + load_timings(run["timings"]),
+                    "indexes: " + ", ".join(run["indexes"]),
+                    "memory: " + memory_report(run["memory"]),
+                    throughput(run["rows"], run["seconds"])]
+
+
+def load_tables(session, items, cache, query=None, stream=False, progress=None,
+                workers=LOAD_WORKERS, compact=False, memory=None, trace=None):
+    ''' load the input list entries ("d1: /path/file.xlsx") into session
+    with a query only the tables and columns it uses are read
+    stream=True ingests csv files in chunks (flat memory use)
+    up to workers files are parsed at the same time in separate processes,
+    the sheets used from one workbook are read together
+    compact=True shrinks the parsed frames (see compact_frame) and
+    fills the dict memory with {table name: (bytes before, bytes after)}
+    trace (a RunTrace) records the parse and store time of every table
+    returns {table name: seconds} for every table that was (re)loaded '''
+    inputs = [parse_item(f) for f in items]
+    names = [name for name, path, ftype, sheet in inputs]
+    if query is None:
+        used, columns = names, None
+    else:
+        used, columns = referenced_tables(query, names), referenced_columns(query)
+    timings = {}
+    todo = {}  # path -> (file type, [(name, sheet, key)]) of the inputs that need parsing
+    for name, path, ftype, sheet in inputs:
+        if name not in used:
+            continue
+        if ftype == "db":
+            session.attach(name, path)  # queried in place, nothing to load
+            continue
+        key = cache.fingerprint(path, ("compact" if compact else "") + sheet_key(sheet))
+        if session.is_current(name, key, columns):
+            continue
+        if stream and ftype == "csv":
+            start = time.perf_counter()
+            rows = session.load(name, path, ftype, cache, columns, stream=True,
+                                progress=progress, key=key)
+            timings[name] = time.perf_counter() - start
+            if trace is not None:
+                trace.add("ingest", timings[name], table=name, file=path, rows=rows)
+        else:
+            todo.setdefault(path, (ftype, []))[1].append((name, sheet, key))
+    todo = [(path, ftype, tables) for path, (ftype, tables) in todo.items()]
+    # files still in the cache are read here, only the misses are worth a process
+    hits = [t for t in todo if all(cache.is_cached(t[0], columns, sheet) for name, sheet, key in t[2])]
+    misses = [t for t in todo if t not in hits]
+    if workers > 1 and len(misses) > 1:
+        parsed = itertools.chain(_parse_serial(hits, cache, columns, compact),
+                                 _parse_parallel(misses, cache, columns, workers, compact))
+    else:
+        parsed = _parse_serial(todo, cache, columns, compact)
+    files = {name: path for name, path, ftype, sheet in inputs}
+    for name, key, df, seconds, sizes, hit in parsed:
+        start = time.perf_counter()
+        session.store(name, key, df, columns)
+        stored = time.perf_counter() - start
+        timings[name] = seconds + stored
+        if memory is not None and sizes is not None:
+            memory[name] = sizes
+        if trace is not None:
+            trace.add("parse", seconds, table=name, file=files[name], rows=len(df),
+                      columns=len(df.columns), cache="hit" if hit else "miss")
+            trace.add("store", stored, table=name, rows=len(df))
+    session.keep_only(names)
+    return timings
+
+
+def load_heads(session, items, cache, query=None, rows=PREVIEW_INPUT_ROWS):
+    ''' load the first rows of the input list entries into session,
+    for a quick preview of query (sqlite inputs are attached whole)
+    returns {table name: seconds} for every table that was (re)loaded '''
+    inputs = [parse_item(f) for f in items]
+    names = [name for name, path, ftype, sheet in inputs]
+    if query is None:
+        used, columns = names, None
+    else:
+        used, columns = referenced_tables(query, names), referenced_columns(query)
+    timings = {}
+    for name, path, ftype, sheet in inputs:
+        if name not in used:
+            continue
+        if ftype == "db":
+            session.attach(name, path)
+            continue
+        key = cache.fingerprint(path, f"head{rows}" + sheet_key(sheet))
+        if session.is_current(name, key, columns):
+            continue
+        start = time.perf_counter()
+        usecols = None if columns is None else (lambda c: str(c).lower() in columns)
+        df = read_input(path, ftype, nrows=rows, usecols=usecols, **_sheet_args(sheet))
+        if len(df.columns) == 0:
+            df = read_input(path, ftype, nrows=rows, **_sheet_args(sheet))
+        session.store(name, key, df, columns)
+        timings[name] = time.perf_counter() - start
+    session.keep_only(names)
+    return timings
+
+
+def fetch_rows(conn, sql, limit=PREVIEW_ROWS, params=None, first=PREVIEW_FIRST, batch=EXPORT_BATCH):
+    ''' run sql on conn and yield (header, rows) with the rows in batches,
+    at most limit in total - the first batch is small so it arrives fast
+    for a script the statements up to its first SELECT are run '''
+    statements = split_statements(sql)
+    selects = [i for i, s in enumerate(statements) if returns_rows(s)]
+    if not selects:
+        raise ValueError("The query does not return any rows.")
+    _drop_temp_tables(conn)
+    with _read_only_inputs(conn):
+        for statement in statements[:selects[0]]:
+            conn.execute(statement, params or ())
+        cur = conn.execute(statements[selects[0]], params or ())
+    header = [d[0] for d in cur.description]
+    rows = cur.fetchmany(min(first, limit))
+    fetched = len(rows)
+    yield header, rows
+    while fetched < limit:
+        rows = cur.fetchmany(min(batch, limit - fetched))
+        if not rows:
+            break
+        fetched += len(rows)
+        yield header, rows
+
+
+def load_timings(timings):
+    ''' per table load times for the log '''
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+
+
+def memory_report(memory):
+    ''' per table memory before and after compact_frame for the log '''
+    mb = lambda n: f"{n / 1048576:.1f} MB"
+    return ", ".join(f"{name} {mb(before)} -> {mb(after)}"
+                     for name, (before, after) in memory.items())
+
+
+def compact_frame(df):
+    ''' shrink df in place: integers and lossless floats downcast,
+    text columns with few distinct values made categorical - the values
+    stored in sqlite are the same, so queries return the same rows
+    (date text stays text: as datetimes '2024-01-05' would be stored
+    as '2024-01-05 00:00:00' and no longer equal the literal)
+    returns (df, bytes before, bytes after) '''
+    before = int(df.memory_usage(deep=True).sum())
+    for name in df.columns:
+        col = df[name]
+        if pd.api.types.is_bool_dtype(col):
+            continue
+        if pd.api.types.is_integer_dtype(col):
+            df[name] = pd.to_numeric(col, downcast="integer")
+        elif pd.api.types.is_float_dtype(col):
+            small = col.astype("float32")
+            if ((small.astype("float64") == col) | col.isna()).all():
+                df[name] = small  # no value changes
+        elif col.dtype == object or pd.api.types.is_string_dtype(col):
+            values = col.dropna()
+            if len(values) == 0:
+                continue
+            if values.nunique() <= CATEGORY_RATIO * len(values):
+                df[name] = col.astype("category")
+    return df, before, int(df.memory_usage(deep=True).sum())
+
+
+def _sheet_args(sheet):
+    return {} if sheet is None else {"sheet_name": sheet}
+
+
+def _parse(cache, path, ftype, sheets, columns, compact):
+    ''' parse the sheets of path (one None for a csv)
+    returns [(DataFrame, memory sizes or None)] in the order of sheets '''
+    if ftype == "xls":
+        frames = cache.load_sheets(path, sheets, columns)
+    else:
+        frames = [cache.load(path, ftype, columns)] * len(sheets)
+    if not compact:
+        return [(df, None) for df in frames]
+    parsed = []
+    for df in frames:
+        df, before, after = compact_frame(df.copy())
+        parsed.append((df, (before, after)))
+    return parsed
+
+
+def _parse_serial(todo, cache, columns, compact):
+    for path, ftype, tables in todo:
+        start = time.perf_counter()
+        misses = cache.misses
+        parsed = _parse(cache, path, ftype, [sheet for name, sheet, key in tables], columns, compact)
+        seconds = (time.perf_counter() - start) / len(tables)  # shared by the sheets
+        for (name, sheet, key), (df, sizes) in zip(tables, parsed):
+            yield name, key, df, seconds, sizes, cache.misses == misses
+
+
+def _parse_parallel(todo, cache, columns, workers, compact):
+    # the workers fill the on-disk cache too and send the frames back
+    # in arrow IPC form, far smaller and faster to unpickle than a DataFrame
+    # the pool only lives for these misses: kept workers would sit idle
+    # in the GUI and keep a batch worker process from exiting
+    with ProcessPoolExecutor(max_workers=min(workers, len(todo)), mp_context=_load_context()) as pool:
+        futures = [(tables, pool.submit(_parse_worker, path, ftype,
+                                        [sheet for name, sheet, key in tables], columns,
+                                        cache.cache_dir, cache.max_mb, cache.use_hash, compact))
+                   for path, ftype, tables in todo]
+        for tables, future in futures:
+            parsed, seconds, hits, misses = future.result()
+            cache.hits += hits
+            cache.misses += misses
+            for (name, sheet, key), (payload, sizes) in zip(tables, parsed):
+                yield name, key, frame_from_bytes(payload), seconds / len(tables), sizes, misses == 0
+
+
+def _load_context():
+    ''' start method of the parsing processes: forkserver (spawn on Windows),
+    never a fork of the threaded GUI process '''
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _parse_worker(path, ftype, sheets, columns, cache_dir, max_mb, use_hash, compact=False):
+    ''' worker process: parse the sheets of one input file
+    returns ([(payload, memory sizes)], seconds, cache hits, cache misses) '''
+    start = time.perf_counter()
+    cache = FrameCache(cache_dir, max_mb, use_hash)
+    parsed = [(frame_to_bytes(df), sizes)
+              for df, sizes in _parse(cache, path, ftype, sheets, columns, compact)]
+    return parsed, time.perf_counter() - start, cache.hits, cache.misses
+
+
+def frame_to_bytes(df):
+    ''' compact serialized DataFrame: arrow IPC stream, or pickle '''
+    if HAVE_ARROW:
+        try:
+            table = pyarrow.Table.from_pandas(df, preserve_index=False)
+            sink = pyarrow.BufferOutputStream()
+            with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return ("arrow", sink.getvalue().to_pybytes())
+        except Exception:
+            pass  # e.g. mixed types in a column
+    return ("pickle", pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def frame_from_bytes(payload):
+    kind, data = payload
+    if kind == "arrow":
+        return pyarrow.ipc.open_stream(data).read_all().to_pandas()
+    return pickle.loads(data)
+
+
+def _create_table_sql(name, df):
+    ''' CREATE TABLE statement with sqlite column types for df '''
+    cols = []
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+            sqltype = "INTEGER"
+        elif pd.api.types.is_float_dtype(dtype):
+            sqltype = "REAL"
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            sqltype = "TIMESTAMP"
+        else:
+            sqltype = "TEXT"
+        cols.append(f'"{str(col).replace(chr(34), chr(34) * 2)}" {sqltype}')
+    return f'CREATE TABLE "{name}" ({", ".join(cols)})'
+
+
+def export_query(conn, sql, outfile, batch=EXPORT_BATCH, params=None, stats=None):
+    ''' run sql on conn and write the rows to outfile, batch rows
+    at a time with fetchmany, the result is never held in memory
+    params are the values of the :name parameters in sql
+    the dict stats gets "query": the seconds sqlite spent producing
+    rows (the rest of the time went into writing outfile)
+    a .csv/.xlsx/.xls output is written to outfile.tmp and only replaces
+    outfile when complete, a .db/.sqlite output in one transaction, so
+    an error or Cancel leaves the last good output in place
+    returns (rows, seconds) '''
+    if not outfile.endswith(OUTPUT_TYPES):
+        raise ValueError("The specified file format is not supported.")
+    start = time.perf_counter()
+    cur = conn.execute(sql, params or ())
+    if stats is not None:
+        cur = _TimedCursor(cur, time.perf_counter() - start)
+    if cur.description is None:
+        raise ValueError("The query does not return any rows.")
+    header = [d[0] for d in cur.description]
+    if outfile.endswith((".sqlite", ".db")):
+        rows = _write_sqlite(cur, header, outfile, batch)
+    else:
+        write = _write_csv if outfile.endswith(".csv") else _write_xlsx
+        tmp = outfile + ".tmp"
+        try:
+            rows = write(cur, header, tmp, batch)
+            os.replace(tmp, outfile)
+        finally:
+            _remove(tmp)
+    if stats is not None:
+        stats["query"] = cur.seconds
+    return rows, time.perf_counter() - start
+
+
+class _TimedCursor:
+    # sums the time spent in fetchmany, where sqlite does the work
+    def __init__(self, cur, seconds=0.0):
+        self.cur = cur
+        self.description = cur.description
+        self.seconds = seconds
+
+    def fetchmany(self, size):
+        start = time.perf_counter()
+        rows = self.cur.fetchmany(size)
+        self.seconds += time.perf_counter() - start
+        return rows
+
+
+def throughput(rows, seconds):
+    ''' rows written and rows per second for the status line and log '''
+    rate = rows / seconds if seconds > 0 else 0
+    return f"{rows:,} rows written in {seconds:.2f}s ({rate:,.0f} rows/s)"
+
+
+def _batches(cur, batch):
+    rows = cur.fetchmany(batch)
+    while rows:
+        yield rows
+        rows = cur.fetchmany(batch)
+
+
+def _write_csv(cur, header, outfile, batch):
+    # the first column is the row number, as pandas to_csv wrote it
+    rows = 0
+    with open(outfile, "w", newline="", encoding="utf-8") as fout:
+        writer = csv.writer(fout, lineterminator="\n")  # as to_csv wrote it
+        writer.writerow([""] + header)
+        for chunk in _batches(cur, batch):
+            writer.writerows([rows + i] + list(r) for i, r in enumerate(chunk))
+            rows += len(chunk)
+    return rows
+
+
+def _write_xlsx(cur, header, outfile, batch):
+    # write-only workbooks stream rows to disk instead of keeping cells
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = None
+    sheet_rows = XLSX_MAX_ROWS
+    rows = 0
+    try:
+        for chunk in _batches(cur, batch):
+            for r in chunk:
+                if sheet_rows == XLSX_MAX_ROWS:
+                    ws = wb.create_sheet(f"Sheet{len(wb.worksheets) + 1}")
+                    ws.append(header)
+                    sheet_rows = 1
+                ws.append(r)
+                sheet_rows += 1
+            rows += len(chunk)
+    except BaseException:
+        for sheet in wb.worksheets:
+            sheet.close()  # finish the sheets' temp files, the workbook is not saved
+        raise
+    if ws is None:
+        ws = wb.create_sheet("Sheet1")
+        ws.append(header)
+    wb.save(outfile)
+    return rows
+
+
+def _write_sqlite(cur, header, outfile, batch):
+    # bulk insert into result_table in one transaction
+    out = sqlite3.connect(outfile)
+    out.execute("PRAGMA synchronous = OFF")
+    out.execute("PRAGMA journal_mode = MEMORY")
+    out.execute("PRAGMA cache_size = -65536")  # 64 MB
+    rows = 0
+    try:
+        chunk = cur.fetchmany(batch)
+        cols = ", ".join(f'"{h}" {_sqlite_type(chunk, i)}' for i, h in enumerate(header))
+        marks = ", ".join("?" * len(header))
+        insert = f'INSERT INTO "{RESULT_TABLE}" VALUES ({marks})'
+        with out:
+            out.execute("BEGIN")  # DDL does not open a transaction by itself
+            out.execute(f'DROP TABLE IF EXISTS "{RESULT_TABLE}"')
+            out.execute(f'CREATE TABLE "{RESULT_TABLE}" ({cols})')
+            while chunk:
+                out.executemany(insert, chunk)
+                rows += len(chunk)
+                chunk = cur.fetchmany(batch)
+    finally:
+        out.close()
+    return rows
+
+
+def _sqlite_type(rows, i):
+    ''' column type from the first non NULL value in column i of rows '''
+    for r in rows:
+        v = r[i]
+        if v is None:
+            continue
+        if isinstance(v, int):
+            return "INTEGER"
+        if isinstance(v, float):
+            return "REAL"
+        if isinstance(v, bytes):
+            return "BLOB"
+        return "TEXT"
+    return ""
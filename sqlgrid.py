@@ -0,0 +1,125 @@
+'''
+code file: sqlgrid.py
+date: Oct 2026
+comments:
+    Virtualized result grid for the query preview
+    A ttk Treeview holds only as many items as fit in the window;
+    scrolling fills them with other rows of the result, so a grid
+    over a million rows costs the same as one over a hundred.
+    The row list may still be growing (rows arrive from a worker
+    thread), the scrollbar follows it until done() is called.
+'''
+import tkinter as tk
+from tkinter import ttk
+
+ROW_HEIGHT = 20   # pixels per Treeview row
+POLL_MS = 200     # refresh while rows are still arriving
+COLUMN_CHARS = 40  # widest initial column, in characters
+
+
+class ResultGrid(ttk.Frame):
+    ''' scrollable grid over header and the list of row tuples rows '''
+
+    def __init__(self, parent, header, rows):
+        ttk.Frame.__init__(self, parent)
+        self.header = header
+        self.rows = rows
+        self.offset = 0  # index of the row in the first item
+        self.loading = True
+        style = ttk.Style()
+        style.configure("Grid.Treeview", rowheight=ROW_HEIGHT)
+        columns = ["row"] + [f"c{i}" for i in range(len(header))]
+        self.tree = ttk.Treeview(self, columns=columns, show="headings",
+                                 style="Grid.Treeview", selectmode="none")
+        self.tree.heading("row", text="#")
+        self.tree.column("row", width=70, anchor="e", stretch=False)
+        for i, name in enumerate(header):
+            self.tree.heading(f"c{i}", text=name)
+            self.tree.column(f"c{i}", width=self._width(i), anchor="w", stretch=False)
+        self.vbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.hbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hbar.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        self.hbar.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.items = []  # the Treeview items, reused for every offset
+        self.tree.bind("<Configure>", self.on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_wheel)
+        for key, units in (("<Up>", -1), ("<Down>", 1)):
+            self.tree.bind(key, lambda e, n=units: self.scroll(n))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible()))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible()))
+        self.tree.bind("<Home>", lambda e: self.show(0))
+        self.tree.bind("<End>", lambda e: self.show(len(self.rows)))
+        self.tree.focus_set()
+        self.after(POLL_MS, self.poll)
+
+    def _width(self, i):
+        ''' initial column width from the header and the first rows '''
+        sample = [self.header[i]] + [row[i] for row in self.rows[:50]]
+        chars = max(len(str(v)) for v in sample)
+        return 8 * min(max(chars, 4), COLUMN_CHARS) + 16
+
+    def visible(self):
+        return len(self.items)
+
+    def on_resize(self, e=None):
+        ''' create or delete items so they just fill the window '''
+        wanted = max(1, (self.tree.winfo_height() - ROW_HEIGHT) // ROW_HEIGHT)
+        while len(self.items) < wanted:
+            self.items.append(self.tree.insert("", tk.END, values=()))
+        while len(self.items) > wanted:
+            self.tree.delete(self.items.pop())
+        self.show(self.offset)
+
+    def on_wheel(self, e):
+        if e.num == 4 or e.delta > 0:
+            self.scroll(-3)
+        else:
+            self.scroll(3)
+        return "break"
+
+    def yview(self, *args):
+        ''' scrollbar command: ("moveto", fraction) or ("scroll", n, what) '''
+        if args[0] == "moveto":
+            self.show(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            n = int(args[1])
+            self.scroll(n * self.visible() if args[2] == "pages" else n)
+
+    def scroll(self, n):
+        self.show(self.offset + n)
+
+    def show(self, offset):
+        ''' fill the items with the rows from offset on '''
+        total = len(self.rows)
+        offset = max(0, min(offset, total - len(self.items)))
+        self.offset = offset
+        for i, item in enumerate(self.items):
+            n = offset + i
+            if n < total:
+                values = [f"{n + 1:,}"] + ["" if v is None else v for v in self.rows[n]]
+            else:
+                values = ()
+            self.tree.item(item, values=values)
+        if total:
+            self.vbar.set(offset / total, min(1.0, (offset + len(self.items)) / total))
+        else:
+            self.vbar.set(0.0, 1.0)
+
+    def poll(self):
+        ''' follow rows while they are still arriving '''
+        if not self.winfo_exists():
+            return
+        self.show(self.offset)
+        if self.loading:
+            self.after(POLL_MS, self.poll)
+
+    def done(self):
+        ''' all rows have arrived '''
+        self.loading = False
+        if self.winfo_exists():
+            self.show(self.offset)
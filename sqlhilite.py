@@ -0,0 +1,149 @@
+'''
+code file: sqlhilite.py
+date: Oct 2026
+comments:
+    Incremental SQL syntax highlighting for a tkinter Text widget
+        remarks, 'literals', keywords and functions
+    Runs on the Tk thread from the <<Modified>> event and only
+    re-tokenizes the lines an edit touched (plus the lines after
+    it whose string state changed, e.g. an opened quote).
+'''
+import re
+
+KEYWORDS = set("""
+    abort action add after all alter analyze and as asc attach autoincrement
+    before begin between by cascade case cast check collate column commit
+    conflict constraint create cross current_date current_time current_timestamp
+    database default deferred delete desc detach distinct drop each else end
+    escape except exclusive exists explain fail for foreign from full glob group
+    having if ignore immediate in index indexed initially inner insert instead
+    intersect into is isnull join key left like limit match natural no not
+    notnull null of offset on or order outer over partition plan pragma primary
+    query raise recursive references regexp reindex release rename replace
+    restrict right rollback row rows savepoint select set table temp temporary
+    then to transaction trigger union unique update using vacuum values view
+    virtual when where window with without""".split())
+
+FUNCTIONS = set("""
+    abs avg char coalesce count date datetime first_value glob group_concat hex
+    ifnull iif instr julianday lag last_value lead length like likely lower
+    ltrim max min nth_value ntile nullif percent_rank printf quote random
+    randomblob rank round row_number rtrim sign sqrt strftime substr substring
+    sum time total trim typeof unicode unixepoch upper zeroblob""".split())
+
+TAGS = ("remarks", "literals", "keywords", "functions")
+
+TOKEN = re.compile(r"(?P<remarks>#.*|//.*|--.*)|(?P<quote>[\"'`])|(?P<word>[A-Za-z_]\w*)")
+
+
+def tokenize_line(text, state=None):
+    ''' tokens of one line as [(tag, start column, end column)]
+    state is the quote still open at the end of the previous line
+    returns (tokens, state at the end of this line) '''
+    tokens = []
+    pos = 0
+    if state:
+        end = text.find(state)
+        if end < 0:
+            return [("literals", 0, len(text))], state
+        tokens.append(("literals", 0, end + 1))
+        pos = end + 1
+    while True:
+        m = TOKEN.search(text, pos)
+        if m is None:
+            break
+        kind = m.lastgroup
+        if kind == "remarks":
+            tokens.append(("remarks", m.start(), len(text)))
+            break
+        if kind == "quote":
+            end = text.find(m.group(), m.end())
+            if end < 0:
+                tokens.append(("literals", m.start(), len(text)))
+                return tokens, m.group()
+            tokens.append(("literals", m.start(), end + 1))
+            pos = end + 1
+            continue
+        word = m.group().lower()
+        if word in FUNCTIONS and text[m.end():].lstrip().startswith("("):
+            tokens.append(("functions", m.start(), m.end()))
+        elif word in KEYWORDS:
+            tokens.append(("keywords", m.start(), m.end()))
+        pos = m.end()
+    return tokens, None
+
+
+class Highlighter:
+    ''' keeps the highlighting tags of a Text widget up to date '''
+
+    def __init__(self, text):
+        self.text = text
+        self.states = []  # quote open at the end of each line (or None)
+        self.mark = None  # first line of the edit being made, None = unknown
+        text.bind("<<Modified>>", self.on_modified, add="+")
+        for sequence in ("<KeyPress>", "<<Paste>>", "<<Cut>>"):
+            text.bind(sequence, self.before_edit, add="+")
+        for sequence in ("<<Undo>>", "<<Redo>>"):
+            text.bind(sequence, self.forget_edit, add="+")
+        text.edit_modified(False)
+        self.refresh()
+
+    def before_edit(self, e=None):
+        ''' remember where the coming edit starts, valid until idle '''
+        line = self._line("insert")
+        if self.text.tag_ranges("sel"):
+            line = min(line, self._line("sel.first"))
+        self.mark = line if self.mark is None else min(self.mark, line)
+        self.text.after_idle(self.forget_edit)
+
+    def forget_edit(self, e=None):
+        ''' the next change has an unknown range (undo, programmatic) '''
+        self.mark = None
+
+    def on_modified(self, e=None):
+        if not self.text.edit_modified():
+            return  # the reset below also sends <<Modified>>
+        self.text.edit_modified(False)
+        if self.mark is None:
+            self.refresh()
+            return
+        lines = self._line("end-1c")
+        first = min(self.mark, self._line("insert"))
+        last = max(self.mark, self._line("insert"))
+        self.relex(first, last, lines - len(self.states))
+
+    def refresh(self):
+        ''' re-tokenize the whole text '''
+        self.states = []
+        self.relex(1, self._line("end-1c"), 0)
+
+    def relex(self, first, last, delta):
+        ''' re-tokenize from line first; lines first..last were edited
+        and the edit changed the number of lines by delta
+        stops after last as soon as a line ends in the same string
+        state as before, the lines below it can not have changed '''
+        old = self.states
+        new = old[:first - 1]
+        state = new[-1] if new else None
+        lines = self._line("end-1c")
+        line = first
+        while line <= lines:
+            text = self.text.get(f"{line}.0", f"{line}.end")
+            tokens, state = tokenize_line(text, state)
+            self.paint(line, tokens)
+            new.append(state)
+            old_line = line - delta
+            if line >= last and 1 <= old_line <= len(old) and old[old_line - 1] == state:
+                new.extend(old[old_line:])
+                break
+            line += 1
+        self.states = new
+
+    def paint(self, line, tokens):
+        for tag in TAGS:
+            self.text.tag_remove(tag, f"{line}.0", f"{line}.end")
+        for tag, start, end in tokens:
+            self.text.tag_add(tag, f"{line}.{start}", f"{line}.{end}")
+
+    def _line(self, index):
+        return int(self.text.index(index).split(".")[0])